@@ -1,9 +1,18 @@
 import streamlit as st
 from utils.db_connection import get_db
 from utils.login_code_generator import save_login_codes, get_unused_codes_count
+from utils.cohort import current_cohort
 
 st.title("Login Code Generator")
 
+# Codes are tagged with the cohort they are for, so it must be set explicitly rather than guessed
+try:
+    live_cohort = current_cohort()
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+st.write(f"Current cohort (accepted at login): {live_cohort}")
+
 # Get database connection
 db = get_db()
 
@@ -17,12 +26,15 @@ num_codes = st.number_input("Number of codes to generate", min_value=1, max_valu
 # Input for code length
 code_length = st.number_input("Code length", min_value=4, max_value=12, value=8)
 
-if st.button("Generate Codes"):
+# Codes for the next class can be generated before the current cohort is switched over
+cohort = st.text_input("Cohort for the new codes", value=live_cohort).strip()
+
+if st.button("Generate Codes", disabled=not cohort):
     # Generate and save the codes
-    generated_codes = save_login_codes(db, num_codes, code_length)
+    generated_codes = save_login_codes(db, num_codes, code_length, cohort)
     
     # Display the generated codes
-    st.write("Generated Codes:")
+    st.write(f"Generated Codes for {cohort}:")
     for code in generated_codes:
         st.code(code)
     
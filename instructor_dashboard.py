@@ -0,0 +1,42 @@
+import streamlit as st
+from utils.activity_monitor import get_activity_monitor
+
+# Staff-only: this lives outside pages/ so students never see it. Run with
+#   streamlit run instructor_dashboard.py
+# Change streams need a replica set. To test locally, start a single-node one
+# (mongod --replSet rs0, then rs.initiate() in mongosh) and set
+#   MONGODB_URI=mongodb://localhost:27017/?replicaSet=rs0
+
+st.set_page_config(page_title="Instructor Dashboard", layout="wide")
+st.title("Instructor Dashboard")
+
+# Shared by all viewers: one change stream no matter how many staff have this open
+monitor = get_activity_monitor()
+st.caption(f"Cohort: {monitor.cohort}. Sessions count as active for {monitor.active_window // 60} minutes after their last message.")
+
+@st.fragment(run_every=5)
+def show_activity():
+    snapshot = monitor.snapshot()
+
+    if snapshot["error"]:
+        st.warning(f"Change stream interrupted, reconnecting: {snapshot['error']}")
+
+    sessions = snapshot["active_sessions"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Active sessions", len(sessions))
+    col2.metric("Turns / min", f"{snapshot['turns_per_minute']:.1f}")
+    col3.metric("Codes redeemed", f"{snapshot['codes_used']} / {snapshot['codes_total']}")
+    col4.metric("Redemption rate", f"{snapshot['redemption_rate']:.0%}")
+
+    for part in ("part1", "part2", "part3"):
+        part_sessions = [s for s in sessions if s["part"] == part]
+        st.subheader(f"{part.replace('part', 'Part ')}: {len(part_sessions)} active")
+        if part_sessions:
+            st.dataframe(
+                [{"Login code": s["user_id"], "Turns": s["turns"], "Last activity (s ago)": s["idle_seconds"]}
+                 for s in part_sessions],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+show_activity()
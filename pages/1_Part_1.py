@@ -1,81 +1,93 @@
 import streamlit as st
-import json
-import uuid
-from pymongo import MongoClient
-from bson import ObjectId, Binary
-from openai import OpenAI
-from utils.db_connection import get_db
-from utils.transcript_utils import add_message_to_transcript, save_transcript
-from utils.login_code_generator import verify_login_code
+from utils.profiling import profiled_run, span
 
-# Check for login code
-if "login_code" not in st.session_state or not st.session_state["login_code"]:
-    st.warning("Please enter your login code on the home page to access this content.")
-    st.stop()
+with profiled_run("Part 1"):
+    with span("imports"):
+        from utils.db_connection import get_db
+        from utils.openai_client import get_openai_client
+        from utils.prompt_retrieval import get_system_prompt
+        from utils.session_memory import get_chat_memory
+        from utils.generation import cancel_generation, start_generation, write_response
+        from utils.transcript_utils import add_message_to_transcript, save_transcript
+        from utils.warmup import start_warmup
 
-# Set up OpenAI API client
-client = OpenAI(api_key=st.secrets["OPENAI_API_1"])
+    start_warmup()
+    # Stop any response still streaming from a previous run of this session
+    cancel_generation()
 
-# Select GPT model
-if "openai_model" not in st.session_state:
-    st.session_state["openai_model"] = "gpt-4o-mini"
+    # Check for login code
+    if "login_code" not in st.session_state or not st.session_state["login_code"]:
+        st.warning("Please enter your login code on the home page to access this content.")
+        st.stop()
 
-# Get the collection for this part
-transcripts = get_db()["part1_transcripts"]
+    # Set up OpenAI API client
+    client = get_openai_client("OPENAI_API_1")
 
-st.title("Part 1")
+    # Select GPT model
+    if "openai_model" not in st.session_state:
+        st.session_state["openai_model"] = "gpt-4o-mini"
 
-def setprompt(part):
-    if "system_prompt" not in st.session_state:
-        st.session_state["system_prompt"] = ""
+    # Get the collection for this part
+    with span("get_db"):
+        transcripts = get_db()["part1_transcripts"]
 
-    with open("parts.json", "r") as file:
-        data = json.load(file)
-        st.session_state["system_prompt"] = data[part]
+    st.title("Part 1")
 
-setprompt("part1")
-
-
-if "chat_history_1" not in st.session_state:
-    st.session_state["chat_history_1"] = []
-
-if not st.session_state["chat_history_1"]:
+    # Only the recent part of the chat is kept in session state; the rest is read from the transcript
     greeting = """Hello. Let's discuss the research context."""
-    st.session_state.chat_history_1 = [{"role": "assistant", "content": greeting}]
-
-# Write chat history
-for message in st.session_state.chat_history_1:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
-
-
-# Chat logic
-if prompt := st.chat_input("Ask the supervisor questions"):
-    st.session_state.chat_history_1.append({"role": "user", "content": prompt})
-    
-    with st.chat_message("user"):
-        st.markdown(prompt)
-
-    with st.chat_message("assistant"):
-        messages_with_system_prompt = [{"role": "system", "content": st.session_state["system_prompt"]}] + [
-            {"role": m["role"], "content": m["content"]}
-        for m in st.session_state.chat_history_1
-        ]
-
-        stream = client.chat.completions.create(
-            model = st.session_state["openai_model"],
-            messages = messages_with_system_prompt,
-            stream = True,
-        )
-        response = st.write_stream(stream)
-
-    st.session_state.chat_history_1.append({"role": "assistant", "content": response})
-
-    # Use the modularized function to add messages to the transcript
-    session_id = st.session_state["uuid"]  # Use the existing UUID for session management
-    user_id = st.session_state.get("user_id", "anonymous")  # Get user ID from session state, default to "anonymous"
-    add_message_to_transcript(transcripts, session_id, user_id, {"role": "user", "content": prompt})
-    add_message_to_transcript(transcripts, session_id, user_id, {"role": "assistant", "content": response})
-
-    # Save the complete transcript
-    save_transcript(transcripts, session_id, user_id, st.session_state["chat_history_1"])
\ No newline at end of file
+    with span("session_memory"):
+        memory = get_chat_memory("chat_memory_1", transcripts, greeting)
+
+    # Write chat history
+    with span("render_history"):
+        history = memory.recent
+        if memory.offloaded and st.button(f"Show {memory.offloaded} earlier messages"):
+            history = memory.full_history()
+        for message in history:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+
+    # Chat logic
+    if prompt := st.chat_input("Ask the supervisor questions"):
+        memory.append({"role": "user", "content": prompt})
+
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Use the modularized function to add messages to the transcript
+        session_id = memory.session_id
+        user_id = memory.user_id
+
+        def save_response(response):
+            # Runs once the response completes, or with what was received if it was interrupted
+            memory.append({"role": "assistant", "content": response})
+            add_message_to_transcript(transcripts, session_id, user_id, {"role": "user", "content": prompt})
+            add_message_to_transcript(transcripts, session_id, user_id, {"role": "assistant", "content": response})
+
+            # Save the complete transcript while all of it is still in memory
+            if memory.is_complete():
+                save_transcript(transcripts, session_id, user_id, memory.recent)
+
+        with st.chat_message("assistant"):
+            history = memory.full_history()
+            # Shared prompt strings, or only the relevant slices of them in retrieval mode
+            with span("system_prompt"):
+                system_prompt = get_system_prompt("part1", history)
+            messages_with_system_prompt = [{"role": "system", "content": system_prompt}] + [
+                {"role": m["role"], "content": m["content"]}
+            for m in history
+            ]
+
+            with span("openai_stream"):
+                task = start_generation(
+                    client,
+                    st.session_state["openai_model"],
+                    messages_with_system_prompt,
+                    on_finish = save_response,
+                )
+                # Cancelled as soon as a rerun, page change or disconnect stops this run
+                write_response(task)
+
+        with span("transcript_writes"):
+            task.wait()
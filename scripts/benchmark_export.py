@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the transcript export layouts.
+Generates a synthetic cohort in memory and exports it with the per-file
+directory layout and with the single-archive (--archive) layout, reporting
+wall time, files created and bytes written for each, plus the time to pull
+one transcript back out of each archive.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the parent directory to the path to import the export script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import export_mongodb_to_csv as exporter
+
+
+class SyntheticCollection:
+    """Minimal read-only stand-in for a pymongo collection holding generated documents."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, *args, **kwargs):
+        return iter(self.docs)
+
+
+def generate_transcripts(num_users, sessions_per_user, turns_per_session, seed=0):
+    """Generate transcript documents shaped like the part collections."""
+    rng = random.Random(seed)
+    words = ("bladder cancer case control cohort bias recall interviewer exposure "
+             "smoking vaping mining pollution prevalence incidence design").split()
+    start = datetime(2025, 3, 1)
+    docs = []
+    for user in range(num_users):
+        sessions = []
+        for session in range(sessions_per_user):
+            transcript = []
+            for _ in range(turns_per_session):
+                transcript.append({"role": "user", "content": " ".join(rng.choices(words, k=15))})
+                transcript.append({"role": "assistant", "content": " ".join(rng.choices(words, k=80))})
+            sessions.append({
+                "session_id": f"session-{user}-{session}",
+                "transcript": transcript,
+                "date": start + timedelta(minutes=user * 7 + session),
+            })
+        docs.append({"_id": f"CODE{user:05d}", "sessions": sessions})
+    return docs
+
+
+def directory_stats(path):
+    """Count files and bytes below a path."""
+    files = 0
+    size = 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def main():
+    """Main function to run the export benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000, help="Documents per collection")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions per document")
+    parser.add_argument("--turns", type=int, default=8, help="Turns per session")
+    args = parser.parse_args()
+
+    collections = {
+        f"part{part}_transcripts": SyntheticCollection(
+            generate_transcripts(args.users, args.sessions, args.turns, seed=part))
+        for part in (1, 2, 3)
+    }
+    total_docs = args.users * len(collections)
+    print(f"Synthetic cohort: {total_docs} documents across {len(collections)} collections")
+    print("=" * 60)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # Current layout: one text file per document plus a summary per part
+        export_dir = tmp / "data_export"
+        export_dir.mkdir()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for name, collection in collections.items():
+                exporter.export_collection_to_text_files(collection, name, export_dir)
+        elapsed = time.perf_counter() - start
+        results["directory"] = (elapsed, *directory_stats(export_dir), None)
+
+        for suffix in (".zip", ".tar"):
+            archive_path = tmp / f"export{suffix}"
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                archive = exporter.TranscriptArchive(archive_path)
+                for name, collection in collections.items():
+                    exporter.export_collection_to_archive(collection, name, archive)
+                archive.close()
+            elapsed = time.perf_counter() - start
+
+            doc_id = f"CODE{args.users // 2:05d}"
+            start = time.perf_counter()
+            extracted = exporter.extract_transcript(archive_path, doc_id, "part2_transcripts")
+            extract_ms = (time.perf_counter() - start) * 1000
+            assert len(extracted) == 1 and doc_id in extracted[0]
+
+            results[f"archive {suffix}"] = (elapsed, 1, archive_path.stat().st_size, extract_ms)
+
+    print(f"{'layout':<14} {'wall s':>8} {'docs/s':>9} {'files':>7} {'MB':>8} {'extract ms':>11}")
+    for layout, (elapsed, files, size, extract_ms) in results.items():
+        extract = f"{extract_ms:.1f}" if extract_ms is not None else "-"
+        print(f"{layout:<14} {elapsed:>8.2f} {total_docs / elapsed:>9.0f} {files:>7} "
+              f"{size / 1e6:>8.1f} {extract:>11}")
+
+
+if __name__ == "__main__":
+    main()
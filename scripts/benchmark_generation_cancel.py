@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark how quickly an abandoned generation stops spending tokens.
+Streams long replies from the fake completions server through the app's
+generation loop and the pages' write_response(). After a few tokens,
+st.write_stream raises StopException, as Streamlit does when a student
+leaves the page mid-response. The script then measures the time until the
+server sees the connection close. The generator is kept referenced, as it
+can be by the stopped run, so only write_response() closing it cancels the
+request. Also checks that the truncated reply is passed on for saving with
+the interrupted marker, and that a failed request is not saved.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+from streamlit.runtime.scriptrunner_utils.exceptions import StopException
+
+import utils.generation as generation
+from utils.generation import GenerationLoop, GenerationTask, TRUNCATION_MARKER, write_response
+from fake_completions_server import start_server
+
+
+class StoppedWriteStream:
+    """Stand-in for st.write_stream that is stopped after a few tokens, keeping the generator."""
+
+    def __init__(self, read_tokens):
+        self.read_tokens = read_tokens
+        self.held = []
+        self.stopped_at = None
+
+    def __call__(self, tokens):
+        self.held.append(tokens)
+        for _ in range(self.read_tokens):
+            next(tokens)
+        self.stopped_at = time.monotonic()
+        raise StopException()
+
+
+def run_once(client, generation_loop, server, read_tokens, timeout):
+    """
+    Start one generation, read a few tokens, abandon it and time the disconnect.
+
+    Returns:
+        tuple: (seconds until the server saw the disconnect or None, tokens the server sent,
+                saved response)
+    """
+    saved = []
+    with server.lock:
+        dropped_before = len(server.disconnects)
+    task = GenerationTask(
+        client,
+        "fake",
+        [{"role": "user", "content": "Tell me about case-control studies."}],
+        on_finish=saved.append,
+    ).start(generation_loop)
+
+    write_stream = StoppedWriteStream(read_tokens)
+    generation.st.write_stream = write_stream
+    try:
+        write_response(task)
+    except StopException:
+        pass
+    abandoned = write_stream.stopped_at
+
+    task.wait(timeout)
+    with server.lock:
+        server.disconnected.wait_for(lambda: len(server.disconnects) > dropped_before, timeout)
+        if len(server.disconnects) == dropped_before:
+            return None, None, saved[0] if saved else None
+        _request, closed, sent = server.disconnects[-1]
+    return closed - abandoned, sent, saved[0] if saved else None
+
+
+def main():
+    """Main function to run the cancellation benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--read-tokens", type=int, default=5, help="Tokens read before leaving")
+    parser.add_argument("--reply-words", type=int, default=2000, help="Length of the full reply")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--max-close-seconds", type=float, default=1.0,
+                        help="Fail if any connection stays open longer than this after leaving")
+    args = parser.parse_args()
+
+    server = start_server(latency=0.05, token_delay=args.token_delay)
+    generation_loop = GenerationLoop()
+    server.reply_words = args.reply_words
+    client = AsyncOpenAI(api_key="fake", base_url=server.base_url, max_retries=0)
+
+    close_times = []
+    failures = []
+
+    # A request that fails must raise in the page and not be saved as a reply
+    saved = []
+    unreachable = AsyncOpenAI(api_key="fake", base_url="http://127.0.0.1:9/v1", max_retries=0)
+    failed_task = GenerationTask(unreachable, "fake", [{"role": "user", "content": "Hi"}],
+                                 on_finish=saved.append)
+    try:
+        list(failed_task.start(generation_loop).stream())
+        failures.append("failed request did not raise")
+    except Exception:
+        pass
+    failed_task.wait(args.max_close_seconds * 5)
+    if saved:
+        failures.append(f"failed request was saved as {saved[0]!r}")
+
+    for run in range(args.runs):
+        elapsed, sent, response = run_once(client, generation_loop, server, args.read_tokens,
+                                           timeout=args.max_close_seconds * 5)
+        if elapsed is None:
+            failures.append(f"run {run}: connection still open")
+            continue
+        close_times.append(elapsed)
+        if response is None or not response.endswith(TRUNCATION_MARKER):
+            failures.append(f"run {run}: truncated response was not saved with the marker")
+        elif elapsed > args.max_close_seconds:
+            failures.append(f"run {run}: connection closed after {elapsed:.3f} s")
+        if run == 0:
+            print(f"Saved response: {response!r}")
+            print(f"Server sent {sent} of {args.reply_words} tokens")
+
+    full_seconds = args.reply_words * args.token_delay
+    print(f"Runs: {args.runs}, tokens read before leaving: {args.read_tokens}, "
+          f"full reply: {args.reply_words} tokens (~{full_seconds:.0f} s)")
+    print("=" * 60)
+    if close_times:
+        close_times.sort()
+        print(f"Time from leaving to connection close: p50 {close_times[len(close_times) // 2] * 1000:.1f} ms, "
+              f"max {close_times[-1] * 1000:.1f} ms")
+    print(f"Active server streams after the runs: {server.active}")
+    server.shutdown()
+
+    if failures:
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
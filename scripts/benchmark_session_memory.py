@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the memory held in Streamlit session state per student.
+Simulates hundreds of sessions chatting in all three parts and compares the
+previous layout (full chat_history_1/2/3 lists plus a per-session copy of the
+system prompt) with the bounded ChatMemory windows, before and after idle
+sessions are evicted.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_memory import ChatMemory, MemoryRegistry
+
+PROMPTS_FILE = "parts.json"
+
+
+def deep_size(obj, seen):
+    """Approximate the memory held by an object graph, counting shared objects once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def make_message(rng, role, words):
+    """Generate a chat message of roughly the given number of words."""
+    vocabulary = ("bladder cancer case control cohort bias recall interviewer exposure "
+                  "smoking vaping mining pollution prevalence incidence design").split()
+    return {"role": role, "content": " ".join(rng.choices(vocabulary, k=words))}
+
+
+def simulate(num_sessions, turns, window, seed=0):
+    """
+    Build session states for both layouts.
+
+    Returns:
+        tuple: (old-style session states, new-style session states, registry, shared prompts)
+    """
+    rng = random.Random(seed)
+    with open(PROMPTS_FILE, "r") as file:
+        prompts_text = file.read()
+    shared_prompts = json.loads(prompts_text)
+
+    registry = MemoryRegistry(idle_seconds=600)
+    old_states = []
+    new_states = []
+    for session in range(num_sessions):
+        old_state = {}
+        new_state = {}
+        for part in (1, 2, 3):
+            messages = [{"role": "assistant", "content": "Hello."}]
+            # Storage is MongoDB in the app, so the benchmark never needs to read it back
+            memory = ChatMemory(None, f"CODE{session:05d}", f"session-{session}", "Hello.", window=window)
+            registry.register(memory)
+            for _ in range(turns):
+                for message in (make_message(rng, "user", 40), make_message(rng, "assistant", 150)):
+                    messages.append(message)
+                    memory.append(message)
+            old_state[f"chat_history_{part}"] = messages
+            # The old pages re-read parts.json on every rerun, giving each session its own copy
+            old_state["system_prompt"] = json.loads(prompts_text)[f"part{part}"]
+            new_state[f"chat_memory_{part}"] = memory
+        old_states.append(old_state)
+        new_states.append(new_state)
+    return old_states, new_states, registry, shared_prompts
+
+
+def main():
+    """Main function to run the session memory benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=30, help="Turns per part per session")
+    parser.add_argument("--window", type=int, default=20, help="Messages kept in session state")
+    parser.add_argument("--idle-fraction", type=float, default=0.5,
+                        help="Fraction of sessions left idle before eviction")
+    args = parser.parse_args()
+
+    old_states, new_states, registry, shared_prompts = simulate(args.sessions, args.turns, args.window)
+
+    # Messages are shared between the two layouts here, so each layout is measured on its own
+    old_bytes = deep_size(old_states, set())
+    new_bytes = deep_size(new_states, set()) + deep_size(shared_prompts, set())
+
+    # Leave a fraction of the sessions idle and sweep
+    now = time.time()
+    idle = int(args.sessions * args.idle_fraction)
+    for state in new_states[:idle]:
+        for memory in state.values():
+            memory.last_seen = now - registry.idle_seconds - 1
+    evicted = registry.sweep(now=now, force=True)
+    evicted_bytes = deep_size(new_states, set()) + deep_size(shared_prompts, set())
+
+    print(f"Sessions: {args.sessions}, turns per part: {args.turns}, window: {args.window} messages")
+    print("=" * 60)
+    print(f"{'layout':<34} {'MB':>8} {'KB/session':>11}")
+    for label, size in (
+        ("full history + prompt copies", old_bytes),
+        ("windowed ChatMemory", new_bytes),
+        (f"windowed, {evicted} idle chats evicted", evicted_bytes),
+    ):
+        print(f"{label:<34} {size / 1e6:>8.2f} {size / 1e3 / args.sessions:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark the import-time cost of the app's modules.
+Each module is imported in a fresh interpreter with `python -X importtime`
+after the modules Streamlit itself loads, so only the app's own import work
+is counted. Modules that must not import streamlit are measured without it. Exits with status 1 if a module is over its time budget or
+eagerly imports a module that should be lazy.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> (budget in milliseconds, modules it must not import at load time)
+BUDGETS = {
+    "utils.profiling": (10, ["streamlit", "pymongo", "openai"]),
+    "utils.db_connection": (20, ["pymongo", "openai"]),
+    "utils.login_code_generator": (20, ["pymongo", "openai", "csv"]),
+    "utils.transcript_utils": (10, ["pymongo", "openai"]),
+    "utils.prompt_utils": (10, ["pymongo", "openai"]),
+    "utils.cohort": (10, ["streamlit", "pymongo", "openai"]),
+    "utils.openai_client": (10, ["pymongo", "openai"]),
+    "utils.warmup": (30, ["pymongo", "openai"]),
+    "utils.generation": (20, ["pymongo", "openai"]),
+    "utils.session_memory": (20, ["pymongo", "openai"]),
+    "utils.prompt_retrieval": (20, ["pymongo", "openai", "numpy"]),
+}
+
+
+def measure_import(module, preload, repeats):
+    """
+    Import a module in fresh interpreters and parse the -X importtime output.
+
+    Args:
+        module: Dotted module name to import
+        preload: Modules imported before timing starts (e.g. streamlit)
+        repeats: Number of fresh interpreters to run; the best time is kept
+
+    Returns:
+        tuple: (best cumulative import time in ms, set of newly imported modules)
+    """
+    code = "".join(f"import {name}\n" for name in preload)
+    code += "import sys\nprint('---', file=sys.stderr)\n"
+    code += f"import {module}\n"
+
+    best_ms = None
+    imported = set()
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+        lines = result.stderr.split("---\n", 1)[1].splitlines()
+        total_us = 0
+        imported = set()
+        for line in lines:
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            imported.add(name.strip())
+            # Top-level entries are not indented; their cumulative covers the nested ones
+            if not name[1:].startswith(" "):
+                total_us += int(cumulative)
+        elapsed_ms = total_us / 1000
+        if best_ms is None or elapsed_ms < best_ms:
+            best_ms = elapsed_ms
+    return best_ms, imported
+
+
+def main():
+    """Main function to run the startup benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--preload", nargs="*", default=["streamlit"],
+                        help="Modules loaded before timing starts (default: streamlit)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. 2 on a slow machine")
+    args = parser.parse_args()
+
+    print("Startup import benchmark")
+    print("=" * 60)
+    print(f"{'module':<30} {'ms':>8} {'budget':>8}  status")
+
+    failures = []
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        budget_ms *= args.scale
+        # A preloaded module never shows up in the output, so forbidden ones are left out of the preload
+        preload = [name for name in args.preload if name not in forbidden]
+        try:
+            elapsed_ms, imported = measure_import(module, preload, args.repeats)
+        except RuntimeError as e:
+            print(f"{module:<30} {'-':>8} {budget_ms:>8.1f}  ERROR: {str(e)}")
+            failures.append(module)
+            continue
+
+        eager = [name for name in forbidden if name in imported]
+        status = "ok"
+        if elapsed_ms > budget_ms:
+            status = "OVER BUDGET"
+        if eager:
+            status = f"imports {', '.join(eager)} eagerly"
+        if status != "ok":
+            failures.append(module)
+        print(f"{module:<30} {elapsed_ms:>8.1f} {budget_ms:>8.1f}  {status}")
+
+    print("=" * 60)
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("All modules within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Script to check the instructor dashboard's activity monitor against a real
+change stream. Runs against a scratch database on MONGODB_URI, which must be
+a replica set (a local single-node replica set is enough). Seeds a cohort,
+starts the monitor while more changes land during its bootstrap, then makes
+the writes the app makes (transcript_utils inserts and pushes, code
+redemptions, TTL-style deletes, and writes to another cohort) and checks
+that snapshot() converges to the expected counts.
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_connection import get_db
+from utils.activity_monitor import ActivityMonitor
+from utils.transcript_utils import add_message_to_transcript, save_transcript
+
+COLLECTION = "part2_transcripts"
+GREETING = {"role": "assistant", "content": "Hello. Let's discuss your study design."}
+
+
+def add_turn(collection, user_id, session_id, turn):
+    """Add one student message and reply, as the part pages do."""
+    add_message_to_transcript(collection, session_id, user_id, {"role": "user", "content": f"Question {turn}"})
+    add_message_to_transcript(collection, session_id, user_id, {"role": "assistant", "content": f"Answer {turn}"})
+
+
+def redeem(login_codes, code):
+    """Mark a code as used the way verify_login_code does."""
+    login_codes.update_one({"code": code}, {"$set": {"used": True, "used_at": datetime.datetime.now()},
+                                            "$unset": {"expires_at": ""}})
+
+
+def run_check(db, cohort, users, turns, timeout):
+    """
+    Drive the monitor through the app's writes and wait for the expected snapshot.
+
+    Returns:
+        tuple: (True if the snapshot matched, seconds from the last write until it did, snapshot, expected)
+    """
+    login_codes = db["login_codes"]
+    transcripts = db[COLLECTION]
+    login_codes.insert_many(
+        [{"code": f"U{i}", "cohort": cohort, "used": False} for i in range(5)]
+        + [{"code": f"R{i}", "cohort": cohort, "used": True} for i in range(2)]
+        + [{"code": f"X{i}", "cohort": "OTHER", "used": False} for i in range(3)]
+    )
+    # A session already in progress, and one from another cohort
+    now = datetime.datetime.now()
+    transcripts.insert_one({"_id": "S0", "cohort": cohort, "sessions": [{
+        "session_id": "session-S0", "date": now,
+        "transcript": [GREETING, {"role": "user", "content": "Question 0"}, {"role": "assistant", "content": "Answer 0"}],
+    }]})
+    transcripts.insert_one({"_id": "OLD", "cohort": "OTHER", "sessions": [{
+        "session_id": "session-OLD", "date": now, "transcript": [GREETING],
+    }]})
+
+    monitor = ActivityMonitor(db, cohort)
+    bootstrap = monitor.bootstrap
+
+    def bootstrap_with_gap_writes():
+        # Changes made after the stream's start time but before the bootstrap reads are seen by both
+        login_codes.insert_one({"code": "G0", "cohort": cohort, "used": False})
+        add_turn(transcripts, "S0", "session-S0", 1)
+        bootstrap()
+
+    monitor.bootstrap = bootstrap_with_gap_writes
+    monitor.start()
+
+    for i in range(users):
+        user_id = f"N{i}"
+        save_transcript(transcripts, f"session-{user_id}", user_id, [GREETING])
+        for turn in range(turns):
+            add_turn(transcripts, user_id, f"session-{user_id}", turn)
+    add_turn(transcripts, "OLD", "session-OLD", 0)
+    redeem(login_codes, "U0")
+    redeem(login_codes, "U1")
+    redeem(login_codes, "X0")
+    # What the TTL index does to an expired unused code
+    login_codes.delete_one({"code": "U4"})
+    last_write = time.monotonic()
+
+    expected = {
+        "codes_total": 5 + 2 + 1 - 1,
+        "codes_used": 2 + 2,
+        "sessions": {"S0": 2, **{f"N{i}": turns for i in range(users)}},
+    }
+    deadline = last_write + timeout
+    while True:
+        snapshot = monitor.snapshot()
+        actual = {
+            "codes_total": snapshot["codes_total"],
+            "codes_used": snapshot["codes_used"],
+            "sessions": {s["user_id"]: s["turns"] for s in snapshot["active_sessions"]},
+        }
+        if actual == expected:
+            return True, time.monotonic() - last_write, actual, expected
+        if time.monotonic() > deadline:
+            return False, None, actual, expected
+        time.sleep(0.05)
+
+
+def main():
+    """Main function to run the activity monitor check."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20, help="New sessions started after the monitor")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per new session")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="Seconds to wait for the snapshot to catch up")
+    args = parser.parse_args()
+
+    if not os.environ.get("MONGODB_URI"):
+        print("Set MONGODB_URI to a replica set, e.g. mongodb://localhost:27017/?replicaSet=rs0")
+        sys.exit(1)
+    cohort = "CHECK"
+    # transcript_utils tags new documents with the configured cohort
+    os.environ["MDHS_COHORT"] = cohort
+
+    db = get_db()
+    scratch = db.client[f"{db.name}_activity_check"]
+    db.client.drop_database(scratch.name)
+    try:
+        matched, latency, actual, expected = run_check(scratch, cohort, args.users, args.turns, args.timeout)
+    finally:
+        db.client.drop_database(scratch.name)
+
+    print(f"Sessions: {args.users} new + 1 in progress, turns per session: {args.turns}")
+    print("=" * 60)
+    if not matched:
+        print(f"Snapshot did not match within {args.timeout} s")
+        print(f"  expected: {expected}")
+        print(f"  actual:   {actual}")
+        sys.exit(1)
+    print(f"Snapshot matched {latency * 1000:.0f} ms after the last write")
+    print(f"Codes redeemed: {actual['codes_used']} / {actual['codes_total']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script to evaluate retrieval-mode system prompts offline.
+Replays sample student questions against each part's retrieval index and
+reports, per question, the prompt size against the full prompt, the time to
+build the prompt, and whether the reference material needed to answer the
+question was included.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.prompt_retrieval import RetrievalPrompt, RETRIEVAL_TOP_K
+
+PROMPTS_FILE = "parts.json"
+
+# (part, question, text that must be in the prompt for a complete answer)
+SAMPLE_QUESTIONS = [
+    ("part2", "What are the advantages of a case-control study?", ["5. Case-Control Studies"]),
+    ("part2", "What are the disadvantages of cohort studies?", ["6. Cohort Studies"]),
+    ("part2", "Could we use an ecological study with population-level data?", ["3. Ecological Studies"]),
+    ("part2", "Would a cross-sectional study give us prevalence data?", ["4. Cross-sectional Studies"]),
+    ("part2", "Is a randomised clinical trial the gold standard here?", ["8. Clinical Trials"]),
+    ("part2", "What is a nested case-control design?", ["7. Newer designs"]),
+    ("part2", "What is the difference between a case report and a case series?",
+     ["1. Case Reports", "2. Case Series"]),
+    ("part2", "Which design is most appropriate given that bladder cancer is rare?",
+     ["Case-control studies: The most appropriate design"]),
+    ("part3", "Should the interviewers be trained to stay neutral?", ["Train interviewers thoroughly"]),
+    ("part3", "Can we blind the data collectors?", ["Blind the data collectors"]),
+    ("part3", "We could check medical records for medication history", ["multiple sources of data"]),
+    ("part3", "How should we match cases and controls?", ["Match cases and controls"]),
+    ("part3", "Could biomarkers confirm the self-reported exposures?", ["Use biomarkers"]),
+    ("part3", "We should use a standardized questionnaire", ["standardized protocols and questionnaires"]),
+    ("part3", "What about recall bias from the time since diagnosis?", ["Shorten the time between diagnosis"]),
+    ("part3", "We should look at employment history in mining", ["occupation data and employment history"]),
+    # Closing feedback lists the points the student missed by number, so every point must be referable
+    ("part3", "That was my sixth suggestion. Which points did I miss?",
+     ["Some of the points considered", "1. Ensure that cases", "2. Use clear and objective criteria",
+      "6. Blind the data collectors", "9. Check occupation data", "12. Use biomarkers",
+      "15. Clearly document and report", "they can also consider 2-4, 6, 7, 9-12"]),
+    ("part2", "I have chosen my design. Can you summarise which ones I considered?",
+     ["1. Case Reports", "4. Cross-sectional Studies", "7. Newer designs", "8. Clinical Trials"]),
+]
+
+
+def count_tokens(text):
+    """Approximate the token count of a text (words and punctuation marks)."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def main():
+    """Main function to run the retrieval evaluation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, default=RETRIEVAL_TOP_K, help="Chunks per request")
+    parser.add_argument("--min-coverage", type=float, default=0.9,
+                        help="Fail if fewer than this fraction of questions are covered")
+    parser.add_argument("--verbose", action="store_true", help="Print each question's result")
+    args = parser.parse_args()
+
+    with open(PROMPTS_FILE, "r") as file:
+        prompts = json.load(file)
+
+    start = time.perf_counter()
+    indexes = {part: RetrievalPrompt(prompts[part]) for part in {q[0] for q in SAMPLE_QUESTIONS}}
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rows = []
+    for part, question, expected in SAMPLE_QUESTIONS:
+        index = indexes[part]
+        start = time.perf_counter()
+        prompt = index.build(question, k=args.k)
+        latency_ms = (time.perf_counter() - start) * 1000
+        covered = all(snippet in prompt for snippet in expected)
+        rows.append((part, question, count_tokens(index.full), count_tokens(prompt), latency_ms, covered))
+
+    print(f"Index build time: {build_ms:.1f} ms, k = {args.k}")
+    print("=" * 60)
+    if args.verbose:
+        print(f"{'part':<6} {'full':>6} {'sent':>6} {'ms':>6}  ok  question")
+        for part, question, full, sent, latency_ms, covered in rows:
+            print(f"{part:<6} {full:>6} {sent:>6} {latency_ms:>6.2f}  {'y' if covered else 'N'}   {question}")
+        print("=" * 60)
+
+    for part in sorted(indexes):
+        part_rows = [row for row in rows if row[0] == part]
+        full = sum(row[2] for row in part_rows)
+        sent = sum(row[3] for row in part_rows)
+        latencies = sorted(row[4] for row in part_rows)
+        coverage = sum(row[5] for row in part_rows) / len(part_rows)
+        print(f"{part}: {len(part_rows)} questions, prompt tokens {full // len(part_rows)} -> "
+              f"{sent // len(part_rows)} per turn ({100 * (1 - sent / full):.0f}% fewer), "
+              f"retrieval p50 {latencies[len(latencies) // 2]:.2f} ms, "
+              f"max {latencies[-1]:.2f} ms, coverage {coverage:.0%}")
+
+    coverage = sum(row[5] for row in rows) / len(rows)
+    print(f"Overall coverage: {coverage:.0%}")
+    if coverage < args.min_coverage:
+        print(f"Coverage is below {args.min_coverage:.0%}!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
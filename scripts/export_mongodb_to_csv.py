@@ -1,21 +1,46 @@
 #!/usr/bin/env python3
 """
 Script to export all MongoDB collections to structured text files.
-This script connects to the MongoDB database and exports all collections
-to individual text files organized by part in separate folders.
+This script connects to the MongoDB database and exports the login code and
+transcript collections to individual text files organized by part in separate
+folders, or with --archive streams them into a single .zip or .tar archive
+with a manifest. Cohort archive collections (archive_*) are skipped.
 """
 
 import os
+import io
 import sys
+import csv
+import gzip
 import json
+import zlib
+import shutil
+import struct
+import tarfile
+import zipfile
+import argparse
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from bson import Binary, ObjectId
 
 # Add the parent directory to the path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.db_connection import get_db
+from utils.cohort import TRANSCRIPT_COLLECTIONS
+
+# Only these are exported; archive_* collections from manage_cohorts.py hold compressed blobs, not transcripts
+EXPORT_COLLECTIONS = ["login_codes"] + TRANSCRIPT_COLLECTIONS
+
+def get_export_collections(db):
+    """Get the collections to export, in EXPORT_COLLECTIONS order, and report any that are skipped."""
+    existing = db.list_collection_names()
+    collections = [name for name in EXPORT_COLLECTIONS if name in existing]
+    skipped = sorted(set(existing) - set(collections))
+    print(f"Found {len(collections)} collections to export: {collections}")
+    if skipped:
+        print(f"Skipping {len(skipped)} other collections: {skipped}")
+    return collections
 
 def create_export_directory():
     """Create the export directory if it doesn't exist."""
@@ -255,8 +280,304 @@ def export_login_codes_to_csv(collection, export_dir):
         f.write(f"Total Documents: {len(documents)}\n")
         f.write(f"Columns: {', '.join(df.columns)}\n")
 
+MANIFEST_NAME = "manifest.jsonl"
+# Transcripts are repetitive text; level 1 keeps most of the size reduction at a fraction of the CPU cost
+COMPRESS_LEVEL = 1
+# Fixed-size record at the end of the archive giving the manifest's offset and size
+TRAILER_FORMAT = "MDHSIDX1 {offset:020d} {size:020d}\n"
+TRAILER_MAGIC = b"MDHSIDX1 "
+TRAILER_SIZE = len(TRAILER_FORMAT.format(offset=0, size=0))
+# The trailer is within the last tar record plus the end-of-archive blocks, or the zip end record
+TAIL_BYTES = tarfile.RECORDSIZE + 4 * tarfile.BLOCKSIZE
+# Manifest and CSV members are spooled to disk beyond this size
+SPOOL_BYTES = 1024 * 1024
+
+class TranscriptArchive:
+    """
+    Streaming writer for a single-file export archive.
+
+    Transcripts are written one at a time straight into the archive. The
+    manifest and the login codes CSV grow with the cohort, so they are spooled
+    to temporary files once they pass SPOOL_BYTES and copied into the archive
+    at the end. Two formats are supported:
+
+    - .zip: members are deflate-compressed; "offset" in the manifest is the
+      member's local header offset. ZipFile keeps a small ZipInfo per member
+      for the central directory, so memory grows by one entry per transcript.
+    - .tar: members are individually gzip-compressed (.txt.gz) inside an
+      uncompressed tar; "offset" is the start of the member's gzip data, so a
+      transcript can be read with a single seek and read of "size" bytes.
+      TarFile's member list is cleared after each member, so memory use is
+      bounded by the largest document rather than the collection size.
+
+    A manifest.jsonl member listing every transcript is written last, followed
+    by a fixed-size trailer (the zip comment, or a manifest.idx tar member)
+    recording where the manifest is, so readers never scan the archive.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = 0
+        self._manifest = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b")
+        if self.path.suffix == ".zip":
+            self.format = "zip"
+            self._archive = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED,
+                                            compresslevel=COMPRESS_LEVEL)
+        elif self.path.suffix == ".tar":
+            self.format = "tar"
+            self._archive = tarfile.open(self.path, "w", format=tarfile.PAX_FORMAT)
+        else:
+            raise ValueError(f"Unsupported archive type: {self.path.name} (use .zip or .tar)")
+
+    def add_bytes(self, name, data):
+        """
+        Add a member to the archive.
+
+        Returns:
+            dict: Location of the member (name, offset, size, raw_size)
+        """
+        if self.format == "zip":
+            return self.add_file(name, io.BytesIO(data))
+        # Small members are compressed in memory, skipping the spool used by add_file
+        compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+        return self._add_tar_member(name + ".gz", io.BytesIO(compressed), len(compressed), len(data))
+
+    def add_file(self, name, fileobj):
+        """
+        Add a member to the archive, copying it from a binary file object.
+
+        Returns:
+            dict: Location of the member (name, offset, size, raw_size)
+        """
+        if self.format == "zip":
+            with self._archive.open(name, "w") as member:
+                shutil.copyfileobj(fileobj, member)
+            info = self._archive.getinfo(name)
+            return {"name": name, "offset": info.header_offset,
+                    "size": info.compress_size, "raw_size": info.file_size}
+
+        name += ".gz"
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as compressed:
+            with gzip.GzipFile(fileobj=compressed, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(fileobj, gz)
+                raw_size = gz.tell()
+            size = compressed.tell()
+            compressed.seek(0)
+            return self._add_tar_member(name, compressed, size, raw_size)
+
+    def _add_tar_member(self, name, fileobj, size, raw_size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(datetime.now().timestamp())
+        self._archive.addfile(info, fileobj)
+        # TarFile keeps every TarInfo it writes; a tar has no central directory, so none are needed
+        self._archive.members.clear()
+        # The member data (padded to whole 512-byte blocks) ends at the current offset
+        blocks = (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+        data_offset = self._archive.offset - blocks * tarfile.BLOCKSIZE
+        return {"name": name, "offset": data_offset, "size": size, "raw_size": raw_size}
+
+    def record(self, entry):
+        """Append an entry to the manifest."""
+        self._manifest.write((json.dumps(entry) + "\n").encode("utf-8"))
+        self.entries += 1
+
+    def add_transcript(self, collection_name, doc):
+        """Format a transcript document and add it to the archive."""
+        filename = get_safe_filename(collection_name, doc)
+        entry = self.add_bytes(f"{collection_name}/{filename}",
+                               format_transcript_content(doc).encode("utf-8"))
+        entry.update({"collection": collection_name, "doc_id": str(doc.get('_id', 'unknown_id'))})
+        self.record(entry)
+        return entry
+
+    def close(self):
+        """Write the manifest and its trailer, and close the archive."""
+        self._manifest.seek(0)
+        entry = self.add_file(MANIFEST_NAME, self._manifest)
+        self._manifest.close()
+        trailer = TRAILER_FORMAT.format(offset=entry["offset"], size=entry["size"]).encode("ascii")
+        if self.format == "zip":
+            self._archive.comment = trailer
+        else:
+            info = tarfile.TarInfo("manifest.idx")
+            info.size = len(trailer)
+            info.mtime = int(datetime.now().timestamp())
+            self._archive.addfile(info, io.BytesIO(trailer))
+        self._archive.close()
+
+def export_collection_to_archive(collection, collection_name, archive):
+    """Stream a transcript collection into the archive, one document at a time."""
+    print(f"Exporting collection: {collection_name}")
+
+    exported = 0
+    failed = 0
+    # Iterate the cursor directly rather than loading the collection into a list
+    for i, doc in enumerate(collection.find({}), 1):
+        try:
+            archive.add_transcript(collection_name, doc)
+            exported += 1
+        except Exception as e:
+            print(f"  Warning: Could not export document {i} due to: {str(e)}")
+            archive.record({"collection": collection_name,
+                            "doc_id": str(doc.get('_id', 'unknown_id')),
+                            "error": str(e)})
+            failed += 1
+
+    print(f"  Exported {exported} documents ({failed} failed)")
+    return exported, failed
+
+def export_login_codes_to_archive(collection, archive):
+    """Add login codes to the archive as a CSV member."""
+    print(f"Exporting collection: login_codes")
+
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b") as spool:
+        buffer = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        writer = csv.writer(buffer)
+        writer.writerow(['code', 'created_at', 'used', 'used_at'])
+        for doc in collection.find({}, {'code': 1, 'created_at': 1, 'used': 1, 'used_at': 1}):
+            writer.writerow([doc.get('code', ''), doc.get('created_at', ''),
+                             doc.get('used', False), doc.get('used_at', '') or ''])
+            count += 1
+        buffer.flush()
+        buffer.detach()
+        spool.seek(0)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        archive.add_file(f"login_codes_{timestamp}.csv", spool)
+    print(f"  Exported {count} login codes")
+    return count
+
+def export_to_archive(db, collections, archive_path):
+    """Export all collections into a single archive file."""
+    archive = TranscriptArchive(archive_path)
+    summary_lines = [
+        "MongoDB Export Summary",
+        "=" * 40,
+        f"Export Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Database: {db.name}",
+        f"Collections Exported: {len(collections)}",
+        "",
+    ]
+
+    for collection_name in collections:
+        collection = db[collection_name]
+        if collection_name == 'login_codes':
+            count = export_login_codes_to_archive(collection, archive)
+            summary_lines.append(f"  - {collection_name}: {count} codes (CSV)")
+        else:
+            exported, failed = export_collection_to_archive(collection, collection_name, archive)
+            summary_lines.append(f"  - {collection_name}: {exported} transcripts, {failed} failed")
+        print("-" * 40)
+
+    archive.add_bytes("export_summary.txt", "\n".join(summary_lines).encode("utf-8"))
+    archive.close()
+    return archive
+
+def read_member(f, archive_format, offset, size):
+    """
+    Read and decompress one member of an export archive from its manifest location.
+
+    Args:
+        f: The archive opened in binary mode
+        archive_format: "zip" or "tar"
+        offset: Local header offset (zip) or gzip data offset (tar)
+        size: Compressed size in bytes
+
+    Returns:
+        bytes: The member's contents
+    """
+    if archive_format == "tar":
+        f.seek(offset)
+        return gzip.decompress(f.read(size))
+    # Skip the zip local header: 30 fixed bytes, then the file name and extra field
+    f.seek(offset)
+    header = f.read(30)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    f.seek(name_length + extra_length, os.SEEK_CUR)
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(f.read(size))
+
+def read_manifest(archive_path):
+    """Read the manifest entries from an export archive using its trailer."""
+    archive_path = Path(archive_path)
+    archive_format = "zip" if archive_path.suffix == ".zip" else "tar"
+    with open(archive_path, "rb") as f:
+        f.seek(max(f.seek(0, os.SEEK_END) - TAIL_BYTES, 0))
+        tail = f.read()
+        position = tail.rfind(TRAILER_MAGIC)
+        if position < 0:
+            raise ValueError(f"{archive_path.name} has no manifest trailer")
+        _magic, offset, size = tail[position:position + TRAILER_SIZE].split()
+        data = read_member(f, archive_format, int(offset), int(size))
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line]
+
+def extract_transcript(archive_path, doc_id, collection_name=None):
+    """
+    Extract a single transcript from an export archive without unpacking the rest.
+
+    Args:
+        archive_path: Path to the .zip or .tar archive
+        doc_id: Document ID (login code) of the transcript
+        collection_name: Optional collection to restrict the lookup to
+
+    Returns:
+        list: Transcript texts for every matching document
+    """
+    archive_path = Path(archive_path)
+    archive_format = "zip" if archive_path.suffix == ".zip" else "tar"
+    entries = [entry for entry in read_manifest(archive_path)
+               if entry.get("doc_id") == doc_id and "error" not in entry
+               and (collection_name is None or entry["collection"] == collection_name)]
+
+    transcripts = []
+    with open(archive_path, "rb") as f:
+        for entry in entries:
+            transcripts.append(read_member(f, archive_format, entry["offset"], entry["size"]).decode("utf-8"))
+    return transcripts
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Export MongoDB collections to text files or a single archive.")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="Stream all transcripts into one .zip or .tar archive instead of a directory of files")
+    parser.add_argument("--extract", nargs=2, metavar=("ARCHIVE", "DOC_ID"),
+                        help="Print the transcript(s) for DOC_ID from an existing archive")
+    parser.add_argument("--collection", help="Collection to restrict --extract to, e.g. part2_transcripts")
+    return parser.parse_args()
+
 def main():
     """Main function to export all collections."""
+    args = parse_args()
+
+    if args.extract:
+        archive_path, doc_id = args.extract
+        transcripts = extract_transcript(archive_path, doc_id, args.collection)
+        if not transcripts:
+            print(f"No transcript found for {doc_id}")
+            sys.exit(1)
+        print("\n\n".join(transcripts))
+        return
+
+    if args.archive:
+        print("Starting MongoDB export to a single archive...")
+        print("=" * 60)
+        try:
+            print("Connecting to MongoDB...")
+            db = get_db()
+            print(f"Connected to database: {db.name}")
+
+            collections = get_export_collections(db)
+
+            archive = export_to_archive(db, collections, args.archive)
+            print(f"Export completed successfully!")
+            print(f"Archive saved to: {archive.path.absolute()}")
+            print(f"Entries in manifest: {archive.entries}")
+        except Exception as e:
+            print(f"Error during export: {str(e)}")
+            sys.exit(1)
+        return
+
     print("Starting MongoDB to structured text files export...")
     print("=" * 60)
     
@@ -270,9 +591,8 @@ def main():
         db = get_db()
         print(f"Connected to database: {db.name}")
         
-        # Get all collections
-        collections = db.list_collection_names()
-        print(f"Found {len(collections)} collections: {collections}")
+        # Get the login code and transcript collections
+        collections = get_export_collections(db)
         
         # Export each collection
         for collection_name in collections:
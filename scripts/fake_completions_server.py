@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Script to run a local fake OpenAI-compatible chat completions server.
+It answers POST /v1/chat/completions with deterministic responses after a
+configurable latency, so scripts that call the API can be run end-to-end and
+benchmarked without spending tokens. Streaming requests get one server-sent
+event per word, spaced by a configurable token delay.
+"""
+
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCompletionsServer(ThreadingHTTPServer):
+    """Threaded HTTP server that keeps simple request statistics."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency, token_delay=0.05):
+        super().__init__(address, FakeCompletionsHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        # Words in a streamed reply, unless the request sets max_tokens
+        self.reply_words = 200
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        # (request number, time.monotonic() when the client went away, tokens sent) per dropped stream
+        self.disconnects = []
+        self.disconnected = threading.Condition(self.lock)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def fake_reply(messages, words=0):
+    """
+    Build a deterministic reply for a conversation.
+
+    If the system prompt asks for a JSON object with a "raised" list (as the
+    transcript scorer does), the reply picks items of the numbered rubric in
+    the prompt from a checksum of the conversation, and a "chosen" item if
+    the prompt asks for one. Otherwise it is a short plain-text answer, padded
+    to the given number of words (for long streamed replies).
+    """
+    text = "\n".join(str(m.get("content", "")) for m in messages)
+    checksum = zlib.crc32(text.encode("utf-8"))
+    if '"raised"' in text:
+        rubric = text.split("Rubric:\n", 1)[-1]
+        rubric_size = max(len(re.findall(r"^\d+\. ", rubric.split("\n\n", 1)[0], re.MULTILINE)), 1)
+        raised = sorted({(checksum >> shift) % rubric_size + 1 for shift in (0, 4, 8, 12)})
+        reply = {"raised": raised, "comment": "Scored by the fake completions server."}
+        if '"chosen"' in text:
+            reply["chosen"] = raised[0]
+        return json.dumps(reply)
+    reply = f"This is a fake response ({checksum % 1000})."
+    padding = max(words - len(reply.split()), 0)
+    return " ".join([reply] + [f"word{i}" for i in range(padding)])
+
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+    """Request handler for the fake chat completions endpoint."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.latency)
+            if body.get("stream"):
+                self._stream_reply(body, server.requests)
+                return
+            content = fake_reply(body.get("messages", []))
+            prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+            payload = json.dumps({
+                "id": f"chatcmpl-fake-{server.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content.split()),
+                    "total_tokens": prompt_tokens + len(content.split()),
+                },
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _stream_reply(self, body, request_number):
+        """Send the reply as chat.completion.chunk events, noting if the client disconnects."""
+        server = self.server
+        words = fake_reply(body.get("messages", []), words=body.get("max_tokens") or server.reply_words).split(" ")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": f"chatcmpl-fake-{request_number}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        sent = 0
+        try:
+            self.wfile.write(event({"role": "assistant", "content": ""}))
+            for i, word in enumerate(words):
+                self.wfile.write(event({"content": word if i == 0 else " " + word}))
+                self.wfile.flush()
+                sent += 1
+                time.sleep(server.token_delay)
+            self.wfile.write(event({}, "stop") + b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with server.lock:
+                server.disconnects.append((request_number, time.monotonic(), sent))
+                server.disconnected.notify_all()
+            self.close_connection = True
+
+
+def start_server(port=0, latency=0.2, token_delay=0.05):
+    """
+    Start the fake server in a background thread.
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        latency: Seconds to wait before answering each request
+        token_delay: Seconds between streamed tokens
+
+    Returns:
+        FakeCompletionsServer: The running server; call shutdown() to stop it
+    """
+    server = FakeCompletionsServer(("127.0.0.1", port), latency, token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Main function to run the fake server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency, args.token_delay)
+    print(f"Fake completions server listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  requests: {server.requests}, max concurrent: {server.max_active}, "
+                  f"dropped streams: {len(server.disconnects)}")
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Script to manage cohort lifecycle in the MongoDB database.
+Tags untagged login codes and transcripts with a cohort, archives completed
+cohorts out of the live collections in bulk batches, and reports how much
+work the live-path queries do.
+"""
+
+import os
+import sys
+import gzip
+import time
+import zlib
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_connection import get_db
+from utils.cohort import TRANSCRIPT_COLLECTIONS, current_cohort, ensure_indexes
+
+LIVE_COLLECTIONS = ["login_codes"] + TRANSCRIPT_COLLECTIONS
+
+
+def tag_untagged(db, cohort):
+    """Tag every document without a cohort field with the given cohort."""
+    print(f"Tagging untagged documents with cohort {cohort}")
+    for collection_name in LIVE_COLLECTIONS:
+        result = db[collection_name].update_many(
+            {"cohort": {"$exists": False}},
+            {"$set": {"cohort": cohort}},
+        )
+        print(f"  {collection_name}: {result.modified_count} documents tagged")
+
+
+def iter_cohort_batches(collection, cohort, batch_size):
+    """
+    Read the documents of a cohort in batches.
+
+    Each batch is fetched afresh after the previous one has been archived and
+    deleted, so a rerun after an interruption picks up what is left.
+    """
+    while True:
+        batch = list(collection.find({"cohort": cohort}).limit(batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def archive_to_collection(db, collection_name, cohort, batch_size):
+    """
+    Move a cohort's documents into a compressed cold collection.
+
+    Each document is BSON-encoded and zlib-compressed into a "data" field of
+    archive_<collection>, keeping only _id and cohort uncompressed.
+
+    Returns:
+        int: Number of documents archived
+    """
+    import bson
+    from pymongo.errors import BulkWriteError
+
+    collection = db[collection_name]
+    archive = db[f"archive_{collection_name}"]
+    archive.create_index("cohort")
+    archived_at = datetime.now()
+    total = 0
+
+    for batch in iter_cohort_batches(collection, cohort, batch_size):
+        archive_docs = [{
+            "_id": doc["_id"],
+            "cohort": cohort,
+            "archived_at": archived_at,
+            "data": bson.Binary(zlib.compress(bson.encode(doc))),
+        } for doc in batch]
+        try:
+            archive.insert_many(archive_docs, ordered=False)
+        except BulkWriteError as e:
+            # Documents already copied by an interrupted run are duplicates; anything else is fatal
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+        collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        total += len(batch)
+        print(f"  {collection_name}: {total} documents archived")
+    return total
+
+
+def complete_gzip_length(path, chunk_size=1024 * 1024):
+    """
+    Find the end of the last complete gzip member in a file.
+
+    A run killed while writing a batch leaves a member with no end, after
+    which the whole file fails to decompress.
+
+    Returns:
+        int: Byte length of the file's complete members
+    """
+    complete = 0
+    consumed = 0
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            consumed += len(chunk)
+            try:
+                decompressor.decompress(chunk)
+                # A chunk can hold the end of one member and the start of the next
+                while decompressor.eof:
+                    complete = consumed - len(decompressor.unused_data)
+                    rest = decompressor.unused_data
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    if not rest:
+                        break
+                    decompressor.decompress(rest)
+            except zlib.error:
+                break
+    return complete
+
+
+def archive_to_file(db, collection_name, cohort, batch_size, archive_dir):
+    """
+    Move a cohort's documents into a local gzipped BSON file.
+
+    The file is a plain concatenation of BSON documents once decompressed, so
+    it can be restored with mongorestore. Each batch is appended as a complete
+    gzip member and synced to disk before it is deleted from the collection.
+    On restart, a partial member left by an interrupted run is cut off first;
+    its documents were never deleted, so they are archived again.
+
+    Returns:
+        int: Number of documents archived
+    """
+    import bson
+
+    collection = db[collection_name]
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archive_path = archive_dir / f"{collection_name}_{cohort}.bson.gz"
+    total = 0
+
+    if archive_path.exists():
+        complete = complete_gzip_length(archive_path)
+        if complete < archive_path.stat().st_size:
+            print(f"  Removing an incomplete batch from an interrupted run of {archive_path.name}")
+            with open(archive_path, "r+b") as f:
+                f.truncate(complete)
+
+    for batch in iter_cohort_batches(collection, cohort, batch_size):
+        member = gzip.compress(b"".join(bson.encode(doc) for doc in batch))
+        # One complete gzip member per batch; members concatenate into a single valid stream
+        with open(archive_path, "ab") as f:
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+        collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        total += len(batch)
+        print(f"  {collection_name}: {total} documents archived")
+    print(f"  Saved to: {archive_path.absolute()}")
+    return total
+
+
+def archive_cohort(db, cohort, batch_size, archive_dir=None):
+    """Archive every live collection's documents for a cohort."""
+    target = archive_dir.absolute() if archive_dir else "archive_* collections"
+    print(f"Archiving cohort {cohort} to {target}")
+    for collection_name in LIVE_COLLECTIONS:
+        if archive_dir:
+            archive_to_file(db, collection_name, cohort, batch_size, archive_dir)
+        else:
+            archive_to_collection(db, collection_name, cohort, batch_size)
+
+
+def explain_live_queries(db, cohort):
+    """
+    Run explain on the live-path queries for a cohort.
+
+    Returns:
+        dict: Query name -> (keys examined, documents examined, execution ms)
+    """
+    queries = {
+        "verify_login_code": (db["login_codes"], {"cohort": cohort, "code": "NOSUCHCODE"}),
+        "get_unused_codes_count": (db["login_codes"], {"cohort": cohort, "used": False}),
+    }
+    for collection_name in TRANSCRIPT_COLLECTIONS:
+        queries[f"{collection_name} by cohort"] = (db[collection_name], {"cohort": cohort})
+
+    results = {}
+    for name, (collection, query) in queries.items():
+        stats = collection.find(query).explain()["executionStats"]
+        results[name] = (stats["totalKeysExamined"], stats["totalDocsExamined"],
+                         stats["executionTimeMillis"])
+    return results
+
+
+def print_stats(db, cohort):
+    """Print per-cohort document counts and live query costs."""
+    print(f"Current cohort: {cohort}")
+    for collection_name in LIVE_COLLECTIONS:
+        counts = db[collection_name].aggregate([
+            {"$group": {"_id": "$cohort", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ])
+        print(f"  {collection_name}: " + ", ".join(f"{c['_id']}={c['count']}" for c in counts))
+    print("Live queries (keys examined, docs examined, ms):")
+    for name, (keys, docs, millis) in explain_live_queries(db, cohort).items():
+        print(f"  {name:<40} {keys:>8} {docs:>8} {millis:>6}")
+
+
+def benchmark(db, steps, step_size, live_size):
+    """
+    Show that live query cost stays flat as archived cohorts grow.
+
+    Runs against a scratch database: inserts a fixed live cohort, then grows
+    an old cohort step by step and explains the live queries after each step.
+
+    Returns:
+        bool: True if the documents examined never grew with the old cohort
+    """
+    cohort = "LIVE"
+    login_codes = db["login_codes"]
+    ensure_indexes(db)
+    login_codes.insert_many([{"code": f"L{i:07d}", "cohort": cohort, "used": i % 3 == 0}
+                             for i in range(live_size)])
+
+    print(f"{'old docs':>10} {'query':<40} {'keys':>8} {'docs':>8} {'ms':>6}")
+    baseline = None
+    flat = True
+    for step in range(steps + 1):
+        if step:
+            start = (step - 1) * step_size
+            login_codes.insert_many([{"code": f"O{i:07d}", "cohort": "OLD", "used": i % 2 == 0}
+                                     for i in range(start, start + step_size)])
+        results = explain_live_queries(db, cohort)
+        docs_examined = {name: docs for name, (_keys, docs, _ms) in results.items()}
+        if baseline is None:
+            baseline = docs_examined
+        flat = flat and docs_examined == baseline
+        for name, (keys, docs, millis) in results.items():
+            print(f"{step * step_size:>10} {name:<40} {keys:>8} {docs:>8} {millis:>6}")
+    return flat
+
+
+def main():
+    """Main function to manage cohorts."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tag_parser = subparsers.add_parser("tag", help="Tag documents that have no cohort")
+    tag_parser.add_argument("--cohort", required=True)
+
+    archive_parser = subparsers.add_parser("archive", help="Move a completed cohort out of the live collections")
+    archive_parser.add_argument("--cohort", required=True)
+    archive_parser.add_argument("--to-dir", type=Path,
+                                help="Write gzipped BSON files here instead of archive_* collections")
+    archive_parser.add_argument("--batch-size", type=int, default=500)
+    archive_parser.add_argument("--force", action="store_true", help="Allow archiving the current cohort")
+
+    subparsers.add_parser("stats", help="Show cohort sizes and live query costs")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Show live query cost stays flat as old cohorts grow")
+    bench_parser.add_argument("--steps", type=int, default=5)
+    bench_parser.add_argument("--step-size", type=int, default=20000)
+    bench_parser.add_argument("--live-size", type=int, default=300)
+
+    args = parser.parse_args()
+
+    try:
+        db = get_db()
+        if args.command == "tag":
+            tag_untagged(db, args.cohort)
+        elif args.command == "archive":
+            # Fails if no cohort is configured, so the live cohort is never guessed
+            if args.cohort == current_cohort() and not args.force:
+                print(f"Refusing to archive the current cohort {args.cohort} (use --force)")
+                sys.exit(1)
+            start = time.perf_counter()
+            archive_cohort(db, args.cohort, args.batch_size, args.to_dir)
+            print(f"Archive completed in {time.perf_counter() - start:.1f} s")
+        elif args.command == "stats":
+            print_stats(db, current_cohort())
+        elif args.command == "benchmark":
+            scratch = db.client[f"{db.name}_cohort_benchmark"]
+            db.client.drop_database(scratch.name)
+            try:
+                flat = benchmark(scratch, args.steps, args.step_size, args.live_size)
+            finally:
+                db.client.drop_database(scratch.name)
+            if not flat:
+                print("Live query cost grew with archived data!")
+                sys.exit(1)
+            print("Live query cost stayed flat")
+    except Exception as e:
+        print(f"Error during {args.command}: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Script to aggregate the per-run profiles written by utils/profiling.py.
+Prints the hottest functions and the slowest spans across all recorded runs,
+or checks that profiling overhead stays negligible when it is disabled.
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_profiles(profile_dir, page=None):
+    """Load all profile records from the profile directory."""
+    records = []
+    for path in sorted(Path(profile_dir).glob("*.json.gz")):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Could not read {path.name} due to: {str(e)}")
+            continue
+        if page is None or record.get("page") == page:
+            records.append(record)
+    return records
+
+
+def percentile(values, fraction):
+    """Return the value at the given fraction of a sorted list."""
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def print_report(records, top):
+    """Print the hottest functions and slowest spans across runs."""
+    total_samples = sum(r.get("samples", 0) for r in records)
+    self_counts = Counter()
+    total_counts = Counter()
+    spans = defaultdict(list)
+    walls = defaultdict(list)
+
+    for record in records:
+        self_counts.update(record.get("self", {}))
+        total_counts.update(record.get("total", {}))
+        walls[record.get("page", "unknown")].append(record.get("wall_ms", 0))
+        for name, _start_ms, duration_ms in record.get("spans", []):
+            spans[name].append(duration_ms)
+
+    print(f"Runs: {len(records)}")
+    print(f"Samples: {total_samples}")
+    print("")
+
+    print("=" * 60)
+    print("RUN WALL TIME BY PAGE (ms)")
+    print("=" * 60)
+    print(f"{'page':<20} {'runs':>6} {'mean':>10} {'p95':>10} {'max':>10}")
+    for page_name, values in sorted(walls.items()):
+        values.sort()
+        print(f"{page_name:<20} {len(values):>6} {sum(values) / len(values):>10.1f} "
+              f"{percentile(values, 0.95):>10.1f} {values[-1]:>10.1f}")
+    print("")
+
+    print("=" * 60)
+    print("SLOWEST SPANS (ms)")
+    print("=" * 60)
+    print(f"{'span':<24} {'count':>6} {'mean':>10} {'p95':>10} {'max':>10}")
+    ranked_spans = sorted(spans.items(), key=lambda item: sum(item[1]), reverse=True)
+    for name, values in ranked_spans[:top]:
+        values.sort()
+        print(f"{name:<24} {len(values):>6} {sum(values) / len(values):>10.1f} "
+              f"{percentile(values, 0.95):>10.1f} {values[-1]:>10.1f}")
+    print("")
+
+    if not total_samples:
+        return
+
+    print("=" * 60)
+    print("HOTTEST FUNCTIONS (share of samples)")
+    print("=" * 60)
+    print(f"{'self %':>7} {'total %':>8}  function")
+    for label, count in self_counts.most_common(top):
+        print(f"{100 * count / total_samples:>7.1f} {100 * total_counts[label] / total_samples:>8.1f}  {label}")
+    print("")
+
+    print("=" * 60)
+    print("HOTTEST CALL PATHS (cumulative share of samples)")
+    print("=" * 60)
+    for label, count in total_counts.most_common(top):
+        print(f"{100 * count / total_samples:>7.1f}  {label}")
+
+
+def check_overhead(iterations, spans_per_run, budget_us):
+    """
+    Measure the cost of profiled_run() and span() while profiling is disabled.
+
+    Returns:
+        bool: True if the per-run overhead is within the budget
+    """
+    os.environ["MDHS_PROFILE"] = "0"
+    from utils.profiling import profiled_run, span, profiling_enabled
+
+    assert not profiling_enabled()
+
+    def baseline():
+        for _ in range(iterations):
+            for _ in range(spans_per_run):
+                pass
+
+    def instrumented():
+        for _ in range(iterations):
+            with profiled_run("overhead"):
+                for _ in range(spans_per_run):
+                    with span("span"):
+                        pass
+
+    timings = []
+    for func in (baseline, instrumented):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+
+    overhead_us = (timings[1] - timings[0]) / iterations * 1e6
+    print(f"Disabled overhead per run ({spans_per_run} spans): {overhead_us:.2f} us")
+    print(f"Budget: {budget_us:.2f} us")
+    return overhead_us <= budget_us
+
+
+def main():
+    """Main function to aggregate profiles or check overhead."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=os.environ.get("MDHS_PROFILE_DIR", "profiles"),
+                        help="Directory containing profile files (default: profiles)")
+    parser.add_argument("--page", help="Only include runs of this page, e.g. 'Part 2'")
+    parser.add_argument("--top", type=int, default=20, help="Number of rows per table")
+    parser.add_argument("--check-overhead", action="store_true",
+                        help="Measure overhead with profiling disabled and fail if over budget")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--spans-per-run", type=int, default=8)
+    # A rerun takes tens of milliseconds, so 50 us is well under 1%
+    parser.add_argument("--budget-us", type=float, default=50.0,
+                        help="Maximum disabled overhead per run in microseconds")
+    args = parser.parse_args()
+
+    if args.check_overhead:
+        if not check_overhead(args.iterations, args.spans_per_run, args.budget_us):
+            print("Profiling overhead exceeds budget!")
+            sys.exit(1)
+        return
+
+    records = load_profiles(args.dir, args.page)
+    if not records:
+        print(f"No profiles found in {Path(args.dir).absolute()}")
+        sys.exit(1)
+    print_report(records, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Script to score Part 2 and Part 3 sessions against the rubric in parts.json.
+Sessions are streamed from the transcript collections, scored with bounded
+concurrent async chat completion requests, and the scores are written back to
+each session in bulk. Sessions already scored against the current rubric are
+skipped, so an interrupted run can simply be restarted.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime
+
+# Add the parent directory to the path to import utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_connection import get_db
+
+PROMPTS_FILE = "parts.json"
+
+# The rubric for each part is the bullet list that follows this line in its prompt
+RUBRIC_HEADINGS = {
+    "part2": "Study Designs Available:",
+    "part3": "Some of the points considered to reduce bias will be:",
+}
+
+SCORING_INSTRUCTIONS = {
+    "part2": (
+        "Identify which of the numbered study designs the student proposed or discussed with a rationale "
+        "for this scenario, and which single design (if any) they finally chose."
+    ),
+    "part3": (
+        "Identify which of the numbered bias-minimisation points the student raised, even if worded "
+        "differently or only partially."
+    ),
+}
+
+
+def load_rubric(part, prompt):
+    """
+    Extract the numbered rubric items for a part from its system prompt.
+
+    Args:
+        part: Part name, e.g. "part3"
+        prompt: The part's system prompt from parts.json
+
+    Returns:
+        list: Rubric item texts, in order
+    """
+    lines = prompt.splitlines()
+    start = next(i for i, line in enumerate(lines) if line.strip() == RUBRIC_HEADINGS[part])
+    items = []
+    for line in lines[start + 1:]:
+        line = line.strip()
+        if line.startswith("- "):
+            items.append(line[2:])
+        elif line and items:
+            break
+    return items
+
+
+def build_grader_prompt(part, prompt, rubric):
+    """Build the system prompt shared by every scoring request for a part."""
+    numbered = "\n".join(f"{i}. {item}" for i, item in enumerate(rubric, 1))
+    output = '{"raised": [item numbers], "comment": "one sentence of feedback"}'
+    if part == "part2":
+        output = '{"raised": [item numbers], "chosen": item number or null, "comment": "one sentence of feedback"}'
+    # The static text comes first so repeated requests share a cacheable prefix
+    return (
+        "You are assessing a student's chat transcript from a clinical epidemiology tutorial. "
+        "The tutor in the transcript was given the following instructions:\n\n"
+        f"{prompt}\n\n"
+        f"Rubric:\n{numbered}\n\n"
+        f"{SCORING_INSTRUCTIONS[part]} Only count contributions made by the student, not the tutor. "
+        f"Respond with a JSON object only, in the form {output}."
+    )
+
+
+def format_transcript(transcript):
+    """Format a session transcript for the grader."""
+    lines = []
+    for message in transcript:
+        if not isinstance(message, dict):
+            continue
+        role = "Student" if message.get("role") == "user" else "Tutor"
+        lines.append(f"{role}: {message.get('content', '')}")
+    return "\n\n".join(lines)
+
+
+def iter_unscored_sessions(collection, rubric_hash, rescore=False):
+    """
+    Stream sessions that still need scoring from a transcript collection.
+
+    Yields:
+        tuple: (user_id, session_id, transcript)
+    """
+    cursor = collection.find({}, {"sessions.session_id": 1, "sessions.transcript": 1, "sessions.score": 1})
+    for doc in cursor:
+        for session in doc.get("sessions", []):
+            transcript = session.get("transcript")
+            if not isinstance(transcript, list):
+                continue
+            if not any(isinstance(m, dict) and m.get("role") == "user" for m in transcript):
+                continue
+            score = session.get("score")
+            if score and score.get("rubric_hash") == rubric_hash and not rescore:
+                continue
+            yield doc["_id"], session["session_id"], transcript
+
+
+def iter_batches(iterable, size):
+    """Group an iterable into lists of at most size items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_score(part, score, rubric_size):
+    """
+    Check a grader response before it is written back.
+
+    Args:
+        part: Part name, e.g. "part2"
+        score: Parsed JSON response
+        rubric_size: Number of rubric items; valid item numbers are 1..rubric_size
+
+    Returns:
+        dict: The score, with "raised" de-duplicated and sorted
+
+    Raises:
+        ValueError: If "raised" or (for part2) "chosen" holds anything but valid item numbers
+    """
+    def is_item(value):
+        return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= rubric_size
+
+    raised = score.get("raised")
+    if not isinstance(raised, list):
+        raise ValueError("response has no 'raised' list")
+    invalid = [item for item in raised if not is_item(item)]
+    if invalid:
+        raise ValueError(f"'raised' has items outside 1..{rubric_size}: {invalid}")
+    score["raised"] = sorted(set(raised))
+    if part == "part2":
+        chosen = score.get("chosen")
+        if chosen is not None and not is_item(chosen):
+            raise ValueError(f"'chosen' is not an item number in 1..{rubric_size}: {chosen!r}")
+        score["chosen"] = chosen
+    return score
+
+
+async def score_session(client, semaphore, model, part, grader_prompt, rubric_size, transcript):
+    """
+    Score one session with a chat completion request.
+
+    Responses with invalid item numbers count as failures, so the session is
+    scored again on the next run.
+
+    Returns:
+        tuple: (parsed score dict or None, usage object or None, latency in seconds)
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": grader_prompt},
+                    {"role": "user", "content": format_transcript(transcript)},
+                ],
+                response_format={"type": "json_object"},
+                temperature=0,
+            )
+            latency = time.perf_counter() - start
+            score = validate_score(part, json.loads(response.choices[0].message.content), rubric_size)
+            return score, response.usage, latency
+        except Exception as e:
+            print(f"  Warning: Could not score session due to: {str(e)}")
+            return None, None, time.perf_counter() - start
+
+
+def write_scores(collection, scored):
+    """
+    Write a batch of scores back to their sessions with one bulk write.
+
+    Args:
+        collection: Transcript collection
+        scored: List of (user_id, session_id, score) tuples
+
+    Returns:
+        int: Number of sessions updated
+    """
+    from pymongo import UpdateOne
+
+    if not scored:
+        return 0
+    operations = [
+        UpdateOne(
+            {"_id": user_id},
+            {"$set": {"sessions.$[s].score": score}},
+            array_filters=[{"s.session_id": session_id}],
+        )
+        for user_id, session_id, score in scored
+    ]
+    result = collection.bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def score_part(db, client, part, prompt, args, stats):
+    """Score every unscored session of one part."""
+    collection = db[f"{part}_transcripts"]
+    rubric = load_rubric(part, prompt)
+    grader_prompt = build_grader_prompt(part, prompt, rubric)
+    rubric_hash = hashlib.sha256(grader_prompt.encode("utf-8")).hexdigest()[:16]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    print(f"Scoring {part}: {len(rubric)} rubric items (rubric {rubric_hash})")
+    sessions = iter_unscored_sessions(collection, rubric_hash, args.rescore)
+    for batch in iter_batches(sessions, args.batch_size):
+        results = await asyncio.gather(*(
+            score_session(client, semaphore, args.model, part, grader_prompt, len(rubric), transcript)
+            for _user_id, _session_id, transcript in batch
+        ))
+
+        scored = []
+        for (user_id, session_id, _transcript), (score, usage, latency) in zip(batch, results):
+            stats["latencies"].append(latency)
+            if score is None:
+                stats["failed"] += 1
+                continue
+            if usage is not None:
+                stats["prompt_tokens"] += usage.prompt_tokens
+                stats["completion_tokens"] += usage.completion_tokens
+            score.update({"rubric_hash": rubric_hash, "model": args.model, "scored_at": datetime.now()})
+            scored.append((user_id, session_id, score))
+
+        stats["scored"] += write_scores(collection, scored)
+        elapsed = time.perf_counter() - stats["start"]
+        print(f"  {part}: {stats['scored']} scored, {stats['failed']} failed, "
+              f"{stats['scored'] / elapsed:.1f} sessions/s")
+
+
+def print_throughput(stats):
+    """Print throughput and latency figures for the run."""
+    elapsed = time.perf_counter() - stats["start"]
+    latencies = sorted(stats["latencies"])
+    print("=" * 60)
+    print(f"Sessions scored: {stats['scored']}")
+    print(f"Failed requests: {stats['failed']}")
+    print(f"Wall time: {elapsed:.2f} s")
+    if not latencies:
+        return
+    print(f"Throughput: {len(latencies) / elapsed:.1f} requests/s")
+    print(f"Latency p50/p95: {latencies[len(latencies) // 2]:.3f} / "
+          f"{latencies[int(0.95 * (len(latencies) - 1))]:.3f} s")
+    print(f"Tokens: {stats['prompt_tokens']} prompt, {stats['completion_tokens']} completion")
+
+
+async def run(args):
+    """Score all requested parts."""
+    from openai import AsyncOpenAI
+
+    with open(PROMPTS_FILE, "r") as file:
+        prompts = json.load(file)
+
+    server = None
+    base_url = args.base_url
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if args.fake_server:
+        from fake_completions_server import start_server
+        server = start_server(latency=args.fake_latency)
+        base_url = server.base_url
+        api_key = "fake"
+        print(f"Using fake completions server at {base_url}")
+    if not api_key:
+        import streamlit as st
+        api_key = st.secrets[args.api_key_secret]
+
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=args.max_retries)
+    db = get_db()
+    stats = {"scored": 0, "failed": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "latencies": [], "start": time.perf_counter()}
+    try:
+        for part in args.parts:
+            await score_part(db, client, part, prompts[part], args, stats)
+    finally:
+        await client.close()
+        if server is not None:
+            print(f"Fake server requests: {server.requests}, max concurrent: {server.max_active}")
+            server.shutdown()
+    print_throughput(stats)
+
+
+def main():
+    """Main function to score transcripts."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--parts", nargs="+", choices=sorted(RUBRIC_HEADINGS), default=sorted(RUBRIC_HEADINGS))
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--batch-size", type=int, default=200,
+                        help="Sessions read and written back per batch")
+    parser.add_argument("--rescore", action="store_true", help="Score sessions even if already scored")
+    parser.add_argument("--base-url", help="OpenAI-compatible API base URL")
+    parser.add_argument("--api-key-secret", default="OPENAI_API_2",
+                        help="Secret holding the API key if OPENAI_API_KEY is not set")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--fake-server", action="store_true",
+                        help="Start a local fake completions server and score against it")
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except Exception as e:
+        print(f"Error during scoring: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
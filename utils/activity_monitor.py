@@ -0,0 +1,251 @@
+import re
+import time
+import threading
+from collections import deque
+
+import streamlit as st
+
+from .db_connection import get_db
+from .cohort import TRANSCRIPT_COLLECTIONS, current_cohort
+
+# Update paths written by transcript_utils: a new session, a pushed message, or a whole transcript
+_SESSION_PATH = re.compile(r"^sessions\.(\d+)$")
+_MESSAGE_PATH = re.compile(r"^sessions\.(\d+)\.transcript\.(\d+)$")
+_TRANSCRIPT_PATH = re.compile(r"^sessions\.(\d+)\.transcript$")
+
+
+def _count_user_turns(transcript):
+    """Count the student messages in a transcript list."""
+    if not isinstance(transcript, list):
+        return 0
+    return sum(1 for m in transcript if isinstance(m, dict) and m.get("role") == "user")
+
+
+class ActivityMonitor:
+    """
+    Incremental aggregates of student activity fed by MongoDB change streams.
+
+    One monitor is shared by every dashboard viewer, so the database sees a
+    single change stream and a one-off bootstrap query however many viewers
+    there are. Change streams require a replica set (Atlas, or a local
+    single-node replica set for testing with scripts/check_activity_monitor.py).
+
+    The stream starts from the cluster time read before the bootstrap, so no
+    change is lost in between. Changes in that gap are seen by both, so every
+    update is idempotent: codes are tracked as sets of ids, and a pushed
+    message only counts if its index is past the messages already seen.
+    """
+
+    def __init__(self, db, cohort, active_window=600, rate_window=60):
+        self.db = db
+        self.cohort = cohort
+        self.active_window = active_window
+        self.rate_window = rate_window
+        self.sessions = {}
+        self.turn_times = deque()
+        # Ids of this cohort's login codes and transcript documents; change events carry only the id
+        self.unused_codes = set()
+        self.used_codes = set()
+        self.transcript_ids = {name: set() for name in TRANSCRIPT_COLLECTIONS}
+        self.events = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._resume_token = None
+        self._start_at = None
+        self._thread = None
+
+    @property
+    def codes_total(self):
+        return len(self.unused_codes) + len(self.used_codes)
+
+    @property
+    def codes_used(self):
+        return len(self.used_codes)
+
+    def bootstrap(self):
+        """Load the starting counts and the sessions active within the window."""
+        import datetime
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=self.active_window)
+        now = time.time()
+        codes = self.db["login_codes"].find({"cohort": self.cohort}, {"used": 1})
+        with self._lock:
+            for doc in codes:
+                (self.used_codes if doc.get("used") else self.unused_codes).add(doc["_id"])
+            for collection_name in TRANSCRIPT_COLLECTIONS:
+                collection = self.db[collection_name]
+                self.transcript_ids[collection_name].update(
+                    doc["_id"] for doc in collection.find({"cohort": self.cohort}, {"_id": 1})
+                )
+                cursor = collection.find(
+                    {"cohort": self.cohort, "sessions.date": {"$gte": cutoff}},
+                    {"sessions.date": 1, "sessions.transcript.role": 1},
+                )
+                for doc in cursor:
+                    for index, session in enumerate(doc.get("sessions", [])):
+                        if session.get("date") and session["date"] >= cutoff:
+                            key = (collection_name, doc["_id"], index)
+                            self._touch(key, now, transcript=session.get("transcript"))
+
+    def _touch(self, key, now, transcript=None, message=None, message_index=None):
+        """
+        Record activity on a session from its whole transcript or one pushed message.
+
+        Caller must hold the lock.
+        """
+        session = self.sessions.get(key)
+        if session is None:
+            session = {"part": key[0].split("_")[0], "user_id": key[1], "turns": 0, "messages": 0}
+            self.sessions[key] = session
+        new_turns = 0
+        if transcript is not None:
+            new_turns = max(_count_user_turns(transcript) - session["turns"], 0)
+            session["messages"] = max(session["messages"], len(transcript) if isinstance(transcript, list) else 0)
+        elif message_index is not None and message_index >= session["messages"]:
+            # Messages at lower indexes were already counted, e.g. by the bootstrap
+            new_turns = 1 if isinstance(message, dict) and message.get("role") == "user" else 0
+            session["messages"] = message_index + 1
+        session["turns"] += new_turns
+        session["last_activity"] = now
+        for _ in range(new_turns):
+            self.turn_times.append(now)
+
+    def apply_change(self, change, now=None):
+        """
+        Update the aggregates from one change stream event.
+
+        Args:
+            change: Change event document
+            now: Event time in seconds since the epoch (default: current time)
+
+        Returns:
+            None
+        """
+        now = now or time.time()
+        collection_name = change["ns"]["coll"]
+        operation = change["operationType"]
+
+        doc_id = change["documentKey"]["_id"]
+
+        with self._lock:
+            self.events += 1
+            if collection_name == "login_codes":
+                if operation == "insert":
+                    doc = change.get("fullDocument", {})
+                    if doc.get("cohort") == self.cohort:
+                        (self.used_codes if doc.get("used") else self.unused_codes).add(doc_id)
+                elif operation == "update":
+                    # Only codes known to be in this cohort count
+                    if doc_id in self.unused_codes and \
+                            change["updateDescription"]["updatedFields"].get("used") is True:
+                        self.unused_codes.discard(doc_id)
+                        self.used_codes.add(doc_id)
+                elif operation == "delete":
+                    # Unused codes removed by the TTL index, or codes archived with --force
+                    self.unused_codes.discard(doc_id)
+                    self.used_codes.discard(doc_id)
+                return
+
+            if operation == "insert":
+                doc = change.get("fullDocument", {})
+                if doc.get("cohort") != self.cohort:
+                    return
+                self.transcript_ids[collection_name].add(doc_id)
+                for index, session in enumerate(doc.get("sessions", [])):
+                    self._touch((collection_name, doc_id, index), now, transcript=session.get("transcript"))
+                return
+
+            if operation == "delete":
+                self.transcript_ids[collection_name].discard(doc_id)
+                for key in [k for k in self.sessions if k[0] == collection_name and k[1] == doc_id]:
+                    del self.sessions[key]
+                return
+
+            if operation != "update" or doc_id not in self.transcript_ids[collection_name]:
+                return
+            for path, value in change["updateDescription"]["updatedFields"].items():
+                if path == "sessions" and isinstance(value, list):
+                    for index, session in enumerate(value):
+                        self._touch((collection_name, doc_id, index), now, transcript=session.get("transcript"))
+                elif match := _SESSION_PATH.match(path):
+                    self._touch((collection_name, doc_id, int(match.group(1))), now,
+                                transcript=value.get("transcript"))
+                elif match := _MESSAGE_PATH.match(path):
+                    self._touch((collection_name, doc_id, int(match.group(1))), now,
+                                message=value, message_index=int(match.group(2)))
+                elif match := _TRANSCRIPT_PATH.match(path):
+                    # save_transcript rewrites the whole transcript; take the count rather than adding to it
+                    self._touch((collection_name, doc_id, int(match.group(1))), now, transcript=value)
+
+    def snapshot(self, now=None):
+        """
+        Get the current aggregates for display.
+
+        Returns:
+            dict: Active sessions, turns per minute and login code redemption
+        """
+        now = now or time.time()
+        with self._lock:
+            while self.turn_times and self.turn_times[0] < now - self.rate_window:
+                self.turn_times.popleft()
+            # Forget idle sessions so memory stays bounded over a long tutorial
+            for key in [k for k, s in self.sessions.items() if s["last_activity"] < now - self.active_window]:
+                del self.sessions[key]
+
+            active = sorted(
+                ({"part": s["part"], "user_id": str(s["user_id"]), "turns": s["turns"],
+                  "idle_seconds": int(now - s["last_activity"])} for s in self.sessions.values()),
+                key=lambda s: (s["part"], s["idle_seconds"]),
+            )
+            return {
+                "active_sessions": active,
+                "turns_per_minute": len(self.turn_times) * 60 / self.rate_window,
+                "codes_total": self.codes_total,
+                "codes_used": self.codes_used,
+                "redemption_rate": self.codes_used / self.codes_total if self.codes_total else 0.0,
+                "events": self.events,
+                "error": self.error,
+            }
+
+    def _watch(self):
+        """Consume the change stream, resuming after errors."""
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": ["login_codes"] + TRANSCRIPT_COLLECTIONS},
+            "operationType": {"$in": ["insert", "update", "delete"]},
+        }}]
+        delay = 1
+        while True:
+            try:
+                # The first stream starts where the bootstrap did; later ones resume after the last event
+                start_at = self._start_at if self._resume_token is None else None
+                with self.db.watch(pipeline, resume_after=self._resume_token,
+                                   start_at_operation_time=start_at) as stream:
+                    self.error = None
+                    delay = 1
+                    for change in stream:
+                        self.apply_change(change)
+                        self._resume_token = stream.resume_token
+            except Exception as e:
+                self.error = str(e)
+                print(f"Warning: activity change stream failed due to: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def start(self):
+        """Bootstrap the aggregates and start watching in a background thread."""
+        # Every command reply on a replica set carries the cluster time it was read at
+        self._start_at = self.db.command("ping").get("operationTime")
+        self.bootstrap()
+        self._thread = threading.Thread(target=self._watch, name="mdhs-activity-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+
+@st.cache_resource
+def get_activity_monitor():
+    """
+    Get the activity monitor shared by every dashboard viewer in this process.
+
+    Returns:
+        ActivityMonitor: Started monitor for the current cohort
+    """
+    return ActivityMonitor(get_db(), current_cohort()).start()
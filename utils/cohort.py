@@ -0,0 +1,74 @@
+import os
+import datetime
+
+# Unused login codes expire this many days after they are generated
+CODE_TTL_DAYS = int(os.environ.get("MDHS_CODE_TTL_DAYS", "180"))
+
+TRANSCRIPT_COLLECTIONS = ["part1_transcripts", "part2_transcripts", "part3_transcripts"]
+
+_current_cohort = None
+
+def current_cohort():
+    """
+    Get the cohort that live queries are restricted to.
+
+    Taken from the MDHS_COHORT environment variable or the COHORT secret.
+    There is deliberately no fallback: every process (each app replica,
+    the login code generator and manage_cohorts.py) must agree on the
+    cohort, and a value guessed from the date would differ between
+    processes started either side of a semester boundary.
+
+    Returns:
+        str: Cohort name, e.g. "2025S1"
+
+    Raises:
+        ValueError: If no cohort is configured
+    """
+    global _current_cohort
+    if _current_cohort is None:
+        cohort = os.environ.get("MDHS_COHORT")
+        if not cohort:
+            try:
+                import streamlit as st
+                cohort = st.secrets.get("COHORT")
+            except Exception:
+                cohort = None
+        if not cohort:
+            raise ValueError("No cohort configured: set the MDHS_COHORT environment variable "
+                             "or the COHORT secret, e.g. \"2025S1\"")
+        _current_cohort = cohort
+    return _current_cohort
+
+def code_expiry(created_at=None):
+    """
+    Get the TTL expiry time for a newly generated login code.
+
+    MongoDB TTL indexes compare against UTC, so the result is timezone-aware.
+
+    Returns:
+        datetime.datetime: When the code should be removed if still unused
+    """
+    created_at = created_at or datetime.datetime.now(datetime.timezone.utc)
+    return created_at + datetime.timedelta(days=CODE_TTL_DAYS)
+
+def ensure_indexes(db):
+    """
+    Create the indexes that keep live queries restricted to the current cohort.
+
+    create_index is a no-op for indexes that already exist, so this is safe to
+    call on every server start.
+
+    Args:
+        db: MongoDB database instance
+
+    Returns:
+        None
+    """
+    login_codes = db["login_codes"]
+    login_codes.create_index([("cohort", 1), ("code", 1)])
+    login_codes.create_index([("cohort", 1), ("used", 1)])
+    # Documents are removed once expires_at has passed; used codes have it unset
+    login_codes.create_index("expires_at", expireAfterSeconds=0)
+
+    for collection_name in TRANSCRIPT_COLLECTIONS:
+        db[collection_name].create_index("cohort")
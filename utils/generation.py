@@ -0,0 +1,199 @@
+import os
+import queue
+import asyncio
+import threading
+
+import streamlit as st
+
+# Appended to a response that was cut short, so transcripts show it was not the full reply
+TRUNCATION_MARKER = "\n\n[Response interrupted]"
+# Longest a script run waits for a response to be saved before carrying on
+SAVE_TIMEOUT_SECONDS = float(os.environ.get("MDHS_SAVE_TIMEOUT_SECONDS", "10"))
+
+_DONE = object()
+
+
+class GenerationLoop:
+    """An asyncio event loop running in a background thread for all generations."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="mdhs-generation-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the loop and return its concurrent future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+class GenerationTask:
+    """
+    One streamed chat completion running on the generation loop.
+
+    The script run consumes tokens with stream(). Cancelling the task stops
+    the upstream request and closes its HTTP connection. Whether the response
+    completes or is cancelled, on_finish is called once with the text received
+    so far (plus TRUNCATION_MARKER if it was cut short); a request that fails
+    is not saved. on_finish runs in a thread of its own, so it can write to
+    the database without holding up the loop or queueing behind other
+    sessions' saves.
+    """
+
+    def __init__(self, client, model, messages, on_finish=None):
+        self.client = client
+        self.model = model
+        self.messages = messages
+        self.on_finish = on_finish
+        self.parts = []
+        self.completed = False
+        self.error = None
+        self.response = None
+        self._tokens = queue.Queue()
+        self._finished = threading.Event()
+        self._future = None
+
+    @property
+    def truncated(self):
+        return not self.completed
+
+    def start(self, generation_loop):
+        self._future = generation_loop.submit(self._run())
+        # A done callback rather than a finally block, so a task cancelled before it starts still finishes
+        self._future.add_done_callback(self._on_done)
+        return self
+
+    async def _run(self):
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self.messages,
+                stream=True,
+            )
+            # Leaving the block, including on cancellation, closes the HTTP response
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        self.parts.append(chunk.choices[0].delta.content)
+                        self._tokens.put(chunk.choices[0].delta.content)
+            self.completed = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+
+    def _on_done(self, future):
+        self._tokens.put(_DONE)
+        threading.Thread(target=self._finish, name="mdhs-generation-save", daemon=True).start()
+
+    def _finish(self):
+        self.response = "".join(list(self.parts)) + (TRUNCATION_MARKER if self.truncated else "")
+        try:
+            if self.error is not None:
+                # A failed request is not a reply; stream() raises the error in the page instead
+                print(f"Warning: generation failed due to: {str(self.error)}")
+            elif self.on_finish is not None:
+                self.on_finish(self.response)
+        except Exception as e:
+            print(f"Warning: could not save response due to: {str(e)}")
+        finally:
+            self._finished.set()
+
+    def stream(self):
+        """
+        Yield response tokens as they arrive, for st.write_stream.
+
+        If the consumer stops early (the script run is interrupted), the
+        generation is cancelled.
+        """
+        try:
+            while True:
+                token = self._tokens.get()
+                if token is _DONE:
+                    break
+                yield token
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Stop the generation; a no-op once it has finished."""
+        if self._future is not None and not self._future.done():
+            self._future.cancel()
+
+    def wait(self, timeout=SAVE_TIMEOUT_SECONDS):
+        """
+        Wait until the response has been passed to on_finish.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            str or None: The final response text, or None on timeout
+        """
+        if not self._finished.wait(timeout):
+            print(f"Warning: response was not saved within {timeout} s")
+        return self.response
+
+
+@st.cache_resource
+def get_generation_loop():
+    """Get the generation loop shared by every session in this process."""
+    return GenerationLoop()
+
+
+def cancel_generation():
+    """
+    Cancel this session's in-flight generation, if any.
+
+    Waits (up to SAVE_TIMEOUT_SECONDS) for its partial response to be saved,
+    so the reply lands in the chat before anything the new run adds.
+    """
+    task = st.session_state.pop("generation", None)
+    if task is not None:
+        task.cancel()
+        task.wait()
+
+
+def start_generation(client, model, messages, on_finish=None):
+    """
+    Start streaming a chat completion for this session.
+
+    Any generation the session already has in flight (e.g. from a part the
+    student navigated away from) is cancelled first.
+
+    Args:
+        client: AsyncOpenAI client
+        model: Model name
+        messages: Messages for the request, including the system prompt
+        on_finish: Called with the final or truncated response text
+
+    Returns:
+        GenerationTask: The running task
+    """
+    cancel_generation()
+    task = GenerationTask(client, model, messages, on_finish).start(get_generation_loop())
+    st.session_state["generation"] = task
+    return task
+
+
+def write_response(task):
+    """
+    Write a task's tokens to the page as they arrive.
+
+    st.write_stream does not close the generator when Streamlit stops the
+    script run (a rerun, a page change or a closed tab); it would only be
+    closed when garbage-collected. Closing it here cancels the generation as
+    soon as the run stops.
+
+    Args:
+        task: The session's GenerationTask
+
+    Returns:
+        str: The text written, as returned by st.write_stream
+    """
+    tokens = task.stream()
+    try:
+        return st.write_stream(tokens)
+    finally:
+        tokens.close()
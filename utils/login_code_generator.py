@@ -1,15 +1,10 @@
 import secrets
 import string
 import datetime
-from pymongo import MongoClient
-import streamlit as st
-import sys
-import os
-import csv
-from pathlib import Path
 
 # Import get_db from the new module
 from .db_connection import get_db
+from .cohort import current_cohort, code_expiry
 
 def generate_login_code(length=8):
     """
@@ -28,7 +23,7 @@ def generate_login_code(length=8):
     code = ''.join(secrets.choice(characters) for _ in range(length))
     return code
 
-def save_login_codes(db, num_codes, length=8):
+def save_login_codes(db, num_codes, length=8, cohort=None):
     """
     Generate and save a specified number of login codes to the database and export to CSV.
     
@@ -36,6 +31,7 @@ def save_login_codes(db, num_codes, length=8):
         db: MongoDB database instance
         num_codes: Number of codes to generate
         length: Length of each code (default: 8)
+        cohort: Cohort to tag the codes with (default: the configured current cohort)
         
     Returns:
         list: List of generated codes
@@ -44,23 +40,31 @@ def save_login_codes(db, num_codes, length=8):
     login_codes = db["login_codes"]
     
     generated_codes = []
+    code_docs = []
     current_time = datetime.datetime.now()
+    cohort = cohort or current_cohort()
+    expires_at = code_expiry()
     
     for _ in range(num_codes):
         code = generate_login_code(length)
         # Create document for the code
-        code_doc = {
+        code_docs.append({
             "code": code,
+            "cohort": cohort,
             "created_at": current_time,
+            "expires_at": expires_at,
             "used": False,
             "used_at": None
-        }
-        
-        # Insert the code into the database
-        login_codes.insert_one(code_doc)
+        })
         generated_codes.append(code)
     
-    # Export codes to CSV
+    # Insert all the codes into the database in one round trip
+    login_codes.insert_many(code_docs)
+    
+    # Export codes to CSV (imported here as only the generator page needs them)
+    import csv
+    from pathlib import Path
+
     export_dir = Path("exports")
     export_dir.mkdir(exist_ok=True)
     
@@ -79,6 +83,8 @@ def verify_login_code(code):
     """
     Verify if a login code is valid and mark it as used.
     
+    Only codes belonging to the current cohort are accepted.
+    
     Args:
         code: Login code to verify
         
@@ -88,20 +94,21 @@ def verify_login_code(code):
     db = get_db()
     login_codes = db["login_codes"]
     
-    result = login_codes.find_one({"code": code})
+    result = login_codes.find_one({"cohort": current_cohort(), "code": code})
     
     if result:
-        # Mark the code as used
+        # Mark the code as used and stop it from expiring
         login_codes.update_one(
             {"_id": result["_id"]},
-            {"$set": {"used": True, "used_at": datetime.datetime.now()}}
+            {"$set": {"used": True, "used_at": datetime.datetime.now()},
+             "$unset": {"expires_at": ""}}
         )
         return code  # Return the code itself as the user ID
     return False
 
 def get_unused_codes_count(db):
     """
-    Get the count of unused login codes.
+    Get the count of unused login codes in the current cohort.
     
     Args:
         db: MongoDB database instance
@@ -110,7 +117,7 @@ def get_unused_codes_count(db):
         int: Number of unused codes
     """
     login_codes = db["login_codes"]
-    return login_codes.count_documents({"used": False})
+    return login_codes.count_documents({"cohort": current_cohort(), "used": False})
 
 
 # Only run this code when the script is run directly, not when imported as a module
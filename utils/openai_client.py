@@ -0,0 +1,21 @@
+import streamlit as st
+
+@st.cache_resource
+def get_openai_client(secret_name):
+    """
+    Get a shared async OpenAI client for the given API key secret.
+
+    openai is imported here rather than at module load because it is one of the
+    slowest imports in the app and the home page never needs it. The client is
+    only used on the generation loop (utils/generation.py), so its connection
+    pool stays bound to that one event loop.
+
+    Args:
+        secret_name: Name of the secret holding the API key, e.g. "OPENAI_API_1"
+
+    Returns:
+        AsyncOpenAI: Client reused across reruns and sessions
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=st.secrets[secret_name])
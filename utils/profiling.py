@@ -0,0 +1,214 @@
+"""
+Opt-in profiling for Streamlit script runs.
+
+Profiling is enabled by setting the MDHS_PROFILE environment variable (or the
+PROFILE secret) to a true value. Each wrapped script run records a sampled call
+profile and the timings of any named spans, and writes them as a gzipped JSON
+file to a rotating local directory. Use scripts/profile_report.py to aggregate
+the results.
+
+When profiling is disabled, profiled_run() and span() return a shared no-op
+context manager so the cost per call is a couple of attribute lookups.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import nullcontext
+
+PROFILE_DIR = os.environ.get("MDHS_PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.environ.get("MDHS_PROFILE_MAX_FILES", "500"))
+PROFILE_INTERVAL_MS = float(os.environ.get("MDHS_PROFILE_INTERVAL_MS", "5"))
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_NULL_CONTEXT = nullcontext()
+_CWD = os.getcwd() + os.sep
+_local = threading.local()
+_enabled = None
+
+
+def profiling_enabled():
+    """
+    Check whether profiling is switched on for this process.
+
+    The MDHS_PROFILE environment variable takes precedence over the PROFILE
+    secret. The result is cached after the first call.
+
+    Returns:
+        bool: True if script runs should be profiled
+    """
+    global _enabled
+    if _enabled is None:
+        value = os.environ.get("MDHS_PROFILE")
+        if value is None:
+            try:
+                import streamlit as st
+                value = st.secrets.get("PROFILE", "")
+            except Exception:
+                value = ""
+        _enabled = str(value).strip().lower() in _TRUE_VALUES
+    return _enabled
+
+
+class _StackSampler(threading.Thread):
+    """Background thread that periodically samples the stack of one thread."""
+
+    def __init__(self, target_ident, interval):
+        super().__init__(name="mdhs-profile-sampler", daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(_CWD):
+                filename = filename[len(_CWD):]
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[self._label(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                label = self._label(frame.f_code)
+                if label not in seen:
+                    seen.add(label)
+                    self.total_counts[label] += 1
+                frame = frame.f_back
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _ProfiledRun:
+    """Context manager that profiles a single script run."""
+
+    def __init__(self, page):
+        self.page = page
+        self.spans = []
+        self._sampler = None
+        self._started = None
+        self._start = None
+
+    def __enter__(self):
+        self._started = time.time()
+        self._start = time.perf_counter()
+        self._sampler = _StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        self._sampler.start()
+        _local.run = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_ms = (time.perf_counter() - self._start) * 1000
+        _local.run = None
+        self._sampler.stop()
+        try:
+            _write_profile({
+                "page": self.page,
+                "started": self._started,
+                "pid": os.getpid(),
+                "wall_ms": round(wall_ms, 3),
+                # Streamlit ends runs early with StopException/RerunException
+                "exit": exc_type.__name__ if exc_type else None,
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": self._sampler.samples,
+                "self": dict(self._sampler.self_counts),
+                "total": dict(self._sampler.total_counts),
+                "spans": self.spans,
+            })
+        except OSError as e:
+            print(f"Warning: could not write profile: {e}")
+        return False
+
+
+class _Span:
+    """Context manager that records the duration of a named span."""
+
+    __slots__ = ("run", "name", "_start")
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.run.spans.append([
+            self.name,
+            round((self._start - self.run._start) * 1000, 3),
+            round((end - self._start) * 1000, 3),
+        ])
+        return False
+
+
+def profiled_run(page):
+    """
+    Wrap a Streamlit script run with profiling.
+
+    Args:
+        page: Name of the page being run (used in the profile file name)
+
+    Returns:
+        A context manager; a no-op one when profiling is disabled
+    """
+    if not profiling_enabled() or getattr(_local, "run", None) is not None:
+        return _NULL_CONTEXT
+    return _ProfiledRun(page)
+
+
+def span(name):
+    """
+    Time a named span within the current profiled run.
+
+    Args:
+        name: Name of the span, e.g. "get_db" or "openai_stream"
+
+    Returns:
+        A context manager; a no-op one outside a profiled run
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL_CONTEXT
+    return _Span(run, name)
+
+
+def _write_profile(record):
+    """Write a profile record and drop the oldest files beyond the limit."""
+    import gzip
+    import json
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(record["started"]))
+    millis = int(record["started"] * 1000) % 1000
+    safe_page = "".join(c if c.isalnum() else "_" for c in record["page"])
+    filename = f"{timestamp}_{millis:03d}_{record['pid']}_{safe_page}.json.gz"
+
+    with gzip.open(os.path.join(PROFILE_DIR, filename), "wt", encoding="utf-8") as f:
+        json.dump(record, f, separators=(",", ":"))
+
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json.gz")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - PROFILE_MAX_FILES, 0)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,238 @@
+import os
+import re
+
+import streamlit as st
+
+from .prompt_utils import get_prompt
+
+# Number of knowledge chunks sent with each request in retrieval mode
+RETRIEVAL_TOP_K = int(os.environ.get("MDHS_RETRIEVAL_TOP_K", "4"))
+
+# Only long lists are worth indexing; short ones stay in the core prompt
+MIN_LIST_ITEMS = 5
+MIN_LIST_CHARS = 600
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words of each item kept in the numbered index left in the core
+INDEX_TITLE_WORDS = 6
+
+_NUMBERED_ITEM = re.compile(r"^\d+\.\s")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_retrieval_parts = None
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "me my of on or so than that the their them then there these they this to was we what "
+    "when which who why will with would you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercase, drop stopwords and strip simple plural endings."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if token.endswith("ies") and len(token) > 4:
+            token = token[:-3] + "y"
+        elif token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def item_title(item):
+    """Shorten a list item to its first sentence, at most INDEX_TITLE_WORDS words."""
+    first_line = _NUMBERED_ITEM.sub("", item.lstrip("- ").splitlines()[0]).strip()
+    words = re.split(r"(?<=\.)\s", first_line, maxsplit=1)[0].split()
+    title = " ".join(words[:INDEX_TITLE_WORDS]).rstrip(":")
+    return title + " ..." if len(words) > INDEX_TITLE_WORDS else title
+
+
+def split_prompt(prompt):
+    """
+    Split a part's prompt into a fixed core and indexable knowledge chunks.
+
+    Long lists in the prompt, either bullet lists or runs of numbered items
+    like the study design definitions, become one chunk per item. Bullet items
+    are numbered so the model can still refer to them by position. Everything
+    else, including short lists such as the answer key, stays in the core. In
+    place of each list the core keeps a compact numbered index of item titles,
+    so the model can still refer to every item by number (e.g. Part 3's closing
+    feedback on the points a student missed); only the full text is retrieved.
+
+    Args:
+        prompt: The part's full system prompt
+
+    Returns:
+        tuple: (core prompt text, list of (heading, chunk text) tuples)
+    """
+    paragraphs = [p.strip("\n") for p in re.split(r"\n\s*\n", prompt) if p.strip()]
+
+    # Group paragraphs into ("text", paragraph), ("numbered", [items]) or ("bullets", [items]) blocks
+    blocks = []
+    for paragraph in paragraphs:
+        lines = paragraph.splitlines()
+        if _NUMBERED_ITEM.match(paragraph):
+            if blocks and blocks[-1][0] == "numbered":
+                blocks[-1][1].append(paragraph)
+            else:
+                blocks.append(("numbered", [paragraph]))
+        elif all(line.lstrip().startswith("- ") for line in lines):
+            blocks.append(("bullets", [line.strip() for line in lines]))
+        else:
+            blocks.append(("text", paragraph))
+
+    core = []
+    chunks = []
+    for index, (kind, content) in enumerate(blocks):
+        if kind == "text":
+            core.append(content)
+            continue
+        items = content
+        if len(items) < MIN_LIST_ITEMS or sum(len(item) for item in items) < MIN_LIST_CHARS:
+            core.append("\n\n".join(items) if kind == "numbered" else "\n".join(items))
+            continue
+
+        heading = ""
+        if index and blocks[index - 1][0] == "text":
+            heading = blocks[index - 1][1].splitlines()[-1].strip()
+        for number, item in enumerate(items, 1):
+            chunks.append((heading, f"{number}. {item[2:]}" if kind == "bullets" else item))
+        index_lines = [f"{number}. {item_title(item)}" for number, item in enumerate(items, 1)]
+        core.append("\n".join(index_lines) + "\n[Full text of the items relevant to the conversation "
+                    "is under \"Relevant reference material\" below.]")
+
+    return "\n\n".join(core), chunks
+
+
+class ChunkIndex:
+    """
+    BM25 index over a fixed set of text chunks.
+
+    Term weights for every chunk are precomputed once, so ranking a query is
+    a column gather and a sum over the query's terms.
+    """
+
+    def __init__(self, chunks, k1=BM25_K1, b=BM25_B):
+        # numpy is imported here as it is slow to import and retrieval mode is off by default
+        import numpy as np
+
+        self.chunks = chunks
+        tokenized = [tokenize(chunk) for chunk in chunks]
+        self.vocabulary = {term: i for i, term in enumerate(sorted({t for tokens in tokenized for t in tokens}))}
+
+        tf = np.zeros((len(chunks), len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(tokenized):
+            for token in tokens:
+                tf[row, self.vocabulary[token]] += 1
+
+        lengths = tf.sum(axis=1, keepdims=True)
+        average_length = lengths.mean() if len(chunks) else 1.0
+        document_frequency = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1 - b + b * lengths / average_length)
+        self.weights = (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def rank(self, query, k):
+        """
+        Rank chunks against a query.
+
+        Args:
+            query: Query text
+            k: Maximum number of chunks to return
+
+        Returns:
+            list: Indices of the top-k chunks with a positive score, best first
+        """
+        import numpy as np
+
+        columns = [self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary]
+        if not columns or not self.chunks:
+            return []
+        scores = self.weights[:, columns].sum(axis=1)
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(i) for i in top if scores[i] > 0]
+
+
+class RetrievalPrompt:
+    """A part's prompt split into a core and a BM25 index over its knowledge chunks."""
+
+    def __init__(self, prompt):
+        self.full = prompt
+        self.core, self.chunks = split_prompt(prompt)
+        self.index = ChunkIndex([text for _heading, text in self.chunks])
+
+    def build(self, query, k=RETRIEVAL_TOP_K):
+        """
+        Build a system prompt holding the core and the top-k chunks for a query.
+
+        Returns:
+            str: The system prompt
+        """
+        selected = sorted(self.index.rank(query, k))
+        if not selected:
+            return self.core
+        sections = []
+        heading = None
+        for i in selected:
+            if self.chunks[i][0] != heading:
+                heading = self.chunks[i][0]
+                sections.append(heading)
+            sections.append(self.chunks[i][1])
+        material = "\n\n".join(section for section in sections if section)
+        return f"{self.core}\n\nRelevant reference material:\n\n{material}"
+
+
+def retrieval_parts():
+    """
+    Get the parts that use retrieval mode.
+
+    Read from the MDHS_PROMPT_RETRIEVAL environment variable or the
+    PROMPT_RETRIEVAL secret as a comma-separated list, e.g. "part2,part3".
+
+    Returns:
+        set: Part names with retrieval enabled
+    """
+    global _retrieval_parts
+    if _retrieval_parts is None:
+        value = os.environ.get("MDHS_PROMPT_RETRIEVAL")
+        if value is None:
+            try:
+                value = st.secrets.get("PROMPT_RETRIEVAL", "")
+            except Exception:
+                value = ""
+        _retrieval_parts = {part.strip() for part in value.split(",") if part.strip()}
+    return _retrieval_parts
+
+
+@st.cache_resource
+def get_retrieval_prompt(part):
+    """Get the shared retrieval index for a part, built once per process."""
+    return RetrievalPrompt(get_prompt(part))
+
+
+def get_system_prompt(part, history):
+    """
+    Get the system prompt for the next request in a chat.
+
+    In retrieval mode the prompt holds the core plus the chunks most relevant
+    to the latest exchange; otherwise it is the full prompt.
+
+    Args:
+        part: Part name, e.g. "part2"
+        history: Chat history ending with the student's latest message
+
+    Returns:
+        str: The system prompt
+    """
+    if part not in retrieval_parts():
+        return get_prompt(part)
+    # The previous reply gives context to short follow-ups like "what about its disadvantages?"
+    query = " ".join(m["content"] for m in history[-2:])
+    return get_retrieval_prompt(part).build(query)
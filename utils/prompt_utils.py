@@ -0,0 +1,29 @@
+import json
+import streamlit as st
+
+PROMPTS_FILE = "parts.json"
+
+@st.cache_resource
+def load_prompts():
+    """
+    Load the system prompts for every part from parts.json.
+
+    The prompts are read once per server process and shared by all sessions.
+
+    Returns:
+        dict: Mapping of part name (e.g. "part1") to its system prompt
+    """
+    with open(PROMPTS_FILE, "r") as file:
+        return json.load(file)
+
+def get_prompt(part):
+    """
+    Get the system prompt for a part.
+
+    Args:
+        part: Part name, e.g. "part1"
+
+    Returns:
+        str: The system prompt
+    """
+    return load_prompts()[part]
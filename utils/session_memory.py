@@ -0,0 +1,182 @@
+import os
+import time
+import weakref
+import threading
+
+import streamlit as st
+
+from .transcript_utils import save_transcript
+
+# Messages of each chat kept in session state; older ones are read back from MongoDB when needed
+HISTORY_WINDOW = int(os.environ.get("MDHS_HISTORY_WINDOW", "20"))
+# Sessions with no rerun for this long have their chat windows dropped from memory
+SESSION_IDLE_SECONDS = int(os.environ.get("MDHS_SESSION_IDLE_SECONDS", "1800"))
+# The greeting is only persisted by save_transcript, which needs the whole first turn in the window
+MIN_WINDOW = 4
+
+
+class ChatMemory:
+    """
+    Bounded in-memory view of one chat, backed by its transcript in MongoDB.
+
+    Only the most recent messages are held in memory. Older messages are
+    counted in `offloaded` and read back from the transcript collection when
+    the full history is needed. Every message must be persisted to the
+    transcript (add_message_to_transcript) before it leaves the window.
+    """
+
+    def __init__(self, collection, user_id, session_id, greeting, window=HISTORY_WINDOW):
+        self.collection = collection
+        self.user_id = user_id
+        self.session_id = session_id
+        self.window = max(window, MIN_WINDOW)
+        self.greeting = greeting
+        self.recent = [{"role": "assistant", "content": greeting}]
+        self.offloaded = 0
+        self.evicted = False
+        self.last_seen = time.time()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.offloaded + len(self.recent)
+
+    def is_complete(self):
+        """Check whether the whole history is held in memory."""
+        return self.offloaded == 0 and not self.evicted
+
+    def _load_stored(self):
+        """Read this chat's persisted transcript from the collection."""
+        doc = self.collection.find_one(
+            {"_id": self.user_id, "sessions.session_id": self.session_id},
+            {"sessions.$": 1},
+        )
+        if not doc:
+            return []
+        return doc["sessions"][0].get("transcript", [])
+
+    def touch(self):
+        """Mark the chat as in use and reload its window if it was evicted."""
+        with self._lock:
+            self.last_seen = time.time()
+            if self.evicted:
+                # A chat evicted before its first turn was never persisted
+                stored = self._load_stored() or [{"role": "assistant", "content": self.greeting}]
+                self.recent = stored[-self.window:]
+                self.offloaded = len(stored) - len(self.recent)
+                self.evicted = False
+
+    def rebind(self, user_id):
+        """
+        Move the chat to another user, e.g. once a student who opened a part
+        before logging in successfully does so.
+
+        The chat is copied to the new user's transcript first, so the stored
+        transcript always starts with the messages that have left the window.
+        """
+        with self._lock:
+            # A complete chat is all in the window; otherwise older messages are only in storage
+            chat = self.recent if self.is_complete() else self._load_stored()
+            save_transcript(self.collection, self.session_id, user_id, list(chat))
+            self.user_id = user_id
+
+    def append(self, message):
+        """Add a message, moving the oldest ones out of the window."""
+        with self._lock:
+            self.recent.append(message)
+            overflow = len(self.recent) - self.window
+            if overflow > 0:
+                del self.recent[:overflow]
+                self.offloaded += overflow
+
+    def full_history(self):
+        """
+        Get the complete chat history, reading older messages from storage.
+
+        Returns:
+            list: Every message in the chat, oldest first
+        """
+        with self._lock:
+            if self.offloaded == 0:
+                return list(self.recent)
+            return self._load_stored()[:self.offloaded] + self.recent
+
+    def evict(self):
+        """Drop the in-memory window; touch() reloads it from storage."""
+        with self._lock:
+            self.offloaded += len(self.recent)
+            self.recent = []
+            self.evicted = True
+
+
+class MemoryRegistry:
+    """Process-wide registry of chat memories used to evict idle sessions."""
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, sweep_interval=60):
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        # Weak references, so memories of closed sessions are freed with their session state
+        self._memories = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+
+    def register(self, memory):
+        with self._lock:
+            self._memories.add(memory)
+
+    def sweep(self, now=None, force=False):
+        """
+        Evict chats that have been idle longer than the timeout.
+
+        Sweeps run at most once per sweep_interval unless forced.
+
+        Returns:
+            int: Number of chats evicted
+        """
+        now = now or time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < self.sweep_interval:
+                return 0
+            self._last_sweep = now
+            memories = list(self._memories)
+
+        evicted = 0
+        for memory in memories:
+            if not memory.evicted and now - memory.last_seen > self.idle_seconds:
+                memory.evict()
+                evicted += 1
+        return evicted
+
+
+@st.cache_resource
+def get_memory_registry():
+    """Get the registry shared by all sessions in this process."""
+    return MemoryRegistry()
+
+
+def get_chat_memory(key, collection, greeting):
+    """
+    Get this session's chat memory for a part, creating it on first use.
+
+    Also evicts other sessions that have gone idle.
+
+    Args:
+        key: Session state key, e.g. "chat_memory_2"
+        collection: Transcript collection for the part
+        greeting: First assistant message of a new chat
+
+    Returns:
+        ChatMemory: The session's chat memory
+    """
+    registry = get_memory_registry()
+    user_id = st.session_state.get("user_id", "anonymous")
+    memory = st.session_state.get(key)
+    if memory is None:
+        memory = ChatMemory(collection, user_id, st.session_state["uuid"], greeting)
+        st.session_state[key] = memory
+        registry.register(memory)
+    memory.touch()
+    # The login code may have been entered, or corrected, after the chat started
+    if memory.user_id != user_id:
+        memory.rebind(user_id)
+    registry.sweep()
+    return memory
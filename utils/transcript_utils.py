@@ -1,5 +1,7 @@
 import datetime
 
+from .cohort import current_cohort
+
 def add_message_to_transcript(transcripts_collection, session_id, user_id, message):
     """
     Add a message to the transcript for a specific session.
@@ -20,6 +22,7 @@ def add_message_to_transcript(transcripts_collection, session_id, user_id, messa
         # Create a new document for the user with an empty sessions list
         transcripts_collection.insert_one({
             "_id": user_id,
+            "cohort": current_cohort(),
             "sessions": []
         })
     
@@ -67,6 +70,7 @@ def save_transcript(transcripts_collection, session_id, user_id, chat_history):
         # Create a new document for the user with the session
         transcripts_collection.insert_one({
             "_id": user_id,
+            "cohort": current_cohort(),
             "sessions": [{
                 "session_id": session_id,
                 "transcript": chat_history,
@@ -0,0 +1,30 @@
+import threading
+import streamlit as st
+
+from .db_connection import get_db
+from .prompt_utils import load_prompts
+
+def _warm_up():
+    """Pre-establish the MongoDB connection, load prompts and import openai."""
+    try:
+        load_prompts()
+        # MongoClient connects lazily, so ping to open the pool before the first student does
+        get_db().client.admin.command("ping")
+        import openai  # noqa: F401
+    except Exception as e:
+        print(f"Warning: warm-up failed due to: {str(e)}")
+
+@st.cache_resource
+def start_warmup():
+    """
+    Start the warm-up in a background thread, once per server process.
+
+    Called at the top of every page so whichever page a student lands on first
+    kicks it off without waiting for it.
+
+    Returns:
+        threading.Thread: The warm-up thread
+    """
+    thread = threading.Thread(target=_warm_up, name="mdhs-warmup", daemon=True)
+    thread.start()
+    return thread